@@ -1,30 +1,40 @@
 import random
 import time
 
+from GameRandom import spawn_rng
+from TiePlayer import TiePlayer
+
 
 class GameEngine():
     """
     An engine to run a game
     """
     
-    def __init__(self, gameState):
+    def __init__(self, gameState, profiler=None, rng=None):
         """
         Input:
             game: a gamestate
+            profiler: optional GameProfiler that times every phase of every move.
+                      With no profiler the engine runs without any timing
+            rng: optional random number generator for the random moves the engine makes
         """
         self.board = gameState
+        self.profiler = profiler
+        self.rng = rng if rng is not None else random
 
     def randomMove(self):
         """
         Finds and applies a random move
         """
         valids = self.board.getPossibleMoves()
-        return random.choice(valids)
+        return self.rng.choice(valids)
 
     def nextMove(self):
         """
         Finds and applies the next move
         """
+        if self.profiler is not None:
+            return self.profiledNextMove()
         try:
             move = self.board.getNextMove()
         except:
@@ -32,6 +42,55 @@ class GameEngine():
         if not self.board.checkIsValid(move):
             move = self.randomMove()
         self.board = self.board.doMove(move)
+
+    def profiledNextMove(self):
+        """
+        Finds and applies the next move like nextMove, timing each phase for the
+        player whose turn it is. The clone and getMove are timed apart, as
+        GameState.getNextMove would do them
+        """
+        profiler = self.profiler
+        player = self.board.currentPlayer()
+
+        try:
+            start = time.perf_counter()
+            board = self.board.clone()
+            profiler.record('clone', player, time.perf_counter() - start)
+            start = time.perf_counter()
+            try:
+                move = player.getMove(board)
+            finally:
+                profiler.record('getMove', player, time.perf_counter() - start)
+        except:
+            move = self.profiledRandomMove(player) # In case an exception is thrown
+
+        start = time.perf_counter()
+        valid = self.board.checkIsValid(move)
+        profiler.record('checkIsValid', player, time.perf_counter() - start)
+        if not valid:
+            move = self.profiledRandomMove(player)
+
+        start = time.perf_counter()
+        self.board = self.board.doMove(move)
+        profiler.record('doMove', player, time.perf_counter() - start)
+
+    def profiledRandomMove(self, player):
+        start = time.perf_counter()
+        move = self.randomMove()
+        self.profiler.record('randomMove', player, time.perf_counter() - start)
+        return move
+
+    def gameEnded(self):
+        """
+        Returns:
+            The result of getGameEnded, timed if there is a profiler
+        """
+        if self.profiler is None:
+            return self.board.getGameEnded()
+        start = time.perf_counter()
+        winner = self.board.getGameEnded()
+        self.profiler.record('getGameEnded', None, time.perf_counter() - start)
+        return winner
         
     def run(self, visualize=True, pause=0):
         """
@@ -40,12 +99,129 @@ class GameEngine():
         if visualize:
             self.board.initializeDrawing()
             self.board.drawBoard()
+
+        if self.profiler is not None:
+            self.profiler.startGame()
+        moves = 0
             
-        while not self.board.getGameEnded():
+        while not self.gameEnded():
             self.nextMove()
+            moves += 1
             if visualize:
                 self.board.drawBoard()
             time.sleep(pause)
 
-        return self.board.getGameEnded()
-    
+        winner = self.board.getGameEnded()
+        if self.profiler is not None:
+            self.profiler.endGame(winner, moves)
+        return winner
+
+    def playHeadless(self):
+        """
+        Plays the current game to the end with no drawing and no pauses
+
+        Returns:
+            winner: the result of getGameEnded at the end of the game, or a TiePlayer
+                    if the game runs out of moves without a winner
+            moves: the number of moves that were played
+        """
+        moves = 0
+        winner = self.gameEnded()
+        while not winner:
+            try:
+                self.nextMove()
+            except IndexError:
+                if self.board.getPossibleMoves():
+                    raise
+                # Nobody can move and nobody has won, so the game is a tie
+                return TiePlayer(self.board.players), moves
+            moves += 1
+            winner = self.gameEnded()
+        return winner, moves
+
+    def newGame(self, factory, index, seed=None):
+        """
+        Input:
+            factory: a function that takes the index of a game and a random number generator
+                     (or None) and returns a fresh gamestate
+            index: the index of the game
+            seed: optional root seed. With a seed, the board, the engine and every seat get
+                  their own random stream, spawned from the seed and the index only
+
+        Returns:
+            board: the new gamestate
+        """
+        if seed is None:
+            return factory(index, None)
+        board = factory(index, spawn_rng(seed, index, "board"))
+        self.rng = spawn_rng(seed, index, "engine")
+        for seat, player in enumerate(board.players):
+            player.rng = spawn_rng(seed, index, "seat", seat)
+        return board
+
+    def replay(self, factory, seed, index, visualize=True, pause=0):
+        """
+        Plays game index of a seeded run_batch again, move for move, as long as the
+        players are built the same way
+
+        Returns:
+            winner: the result of getGameEnded at the end of the game
+        """
+        self.board = self.newGame(factory, index, seed)
+        return self.run(visualize, pause)
+
+    def run_batch(self, factory, n_games, callback=None, seed=None):
+        """
+        Plays many games back to back, reusing this engine, and aggregates the results
+
+        Input:
+            factory: a function that takes the index of a game and a random number generator
+                     (or None) and returns a fresh gamestate
+            n_games: the number of games to play
+            callback: optional function called as callback(index, board, winner) after every game
+            seed: optional root seed. Each game then depends only on the seed and its index,
+                  so results are the same however games are split between processes,
+                  and any game can be played again with replay
+
+        Returns:
+            results: a map with the number of games, wins (a map of Players to wins), ties,
+                     scores (a map of Players to total scores), moves (a list of moves per game),
+                     seconds and games_per_sec
+        """
+        wins = {}
+        scores = {}
+        moves = []
+        ties = 0
+
+        start = time.perf_counter()
+        for index in range(n_games):
+            self.board = self.newGame(factory, index, seed)
+            if self.profiler is not None:
+                self.profiler.startGame(index)
+            winner, nMoves = self.playHeadless()
+            if self.profiler is not None:
+                self.profiler.endGame(winner, nMoves)
+            moves.append(nMoves)
+
+            for player, score in self.board.scoreBoard().items():
+                scores[player] = scores.get(player, 0) + score
+                wins.setdefault(player, 0)
+            if isinstance(winner, TiePlayer):
+                ties += 1
+            else:
+                wins[winner] = wins.get(winner, 0) + 1
+
+            if callback is not None:
+                callback(index, self.board, winner)
+        seconds = time.perf_counter() - start
+
+        return {
+            'games': n_games,
+            'wins': wins,
+            'ties': ties,
+            'scores': scores,
+            'moves': moves,
+            'seconds': seconds,
+            'games_per_sec': n_games / seconds if seconds > 0 else float('inf')
+        }
+
@@ -0,0 +1,149 @@
+import csv
+import json
+
+PHASES = ('clone', 'getMove', 'checkIsValid', 'doMove', 'getGameEnded', 'randomMove')
+
+
+class GameProfiler():
+    """
+    Collects how many times each phase of a game ran and how long it took,
+    per player and per game. Give one to a GameEngine to turn timing on
+    """
+
+    def __init__(self):
+        self.games = []
+        self.current = None
+
+    def startGame(self, index=None):
+        """
+        Starts collecting timings for a new game
+
+        Input:
+            index: optional number of the game, used to label it in the summary
+        """
+        self.current = {
+            'game': len(self.games) if index is None else index,
+            'moves': 0,
+            'winner': None,
+            'phases': {},
+            'players': {}
+        }
+        self.games.append(self.current)
+
+    def endGame(self, winner, moves):
+        """
+        Input:
+            winner: the result of the game
+            moves: the number of moves that were played
+        """
+        if self.current is None:
+            return
+        self.current['winner'] = getattr(winner, 'name', None) if winner else None
+        self.current['moves'] = moves
+        self.current = None
+
+    def record(self, phase, player, seconds):
+        """
+        Adds one call of a phase
+
+        Input:
+            phase: one of PHASES
+            player: the player the call was made for, or None if it belongs to no player
+            seconds: how long the call took
+        """
+        if self.current is None:
+            self.startGame()
+        self.add(self.current['phases'], phase, seconds)
+        if player is not None:
+            name = getattr(player, 'name', str(player))
+            self.add(self.current['players'].setdefault(name, {}), phase, seconds)
+
+    @staticmethod
+    def add(phases, phase, seconds):
+        entry = phases.get(phase)
+        if entry is None:
+            phases[phase] = {'calls': 1, 'seconds': seconds}
+        else:
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+
+    def summary(self):
+        """
+        Returns:
+            summary: a map with the totals of every phase, the totals of every phase
+                     per player, and the timings of every game
+        """
+        phases = {}
+        players = {}
+        for game in self.games:
+            for phase, entry in game['phases'].items():
+                self.merge(phases, phase, entry)
+            for name, playerPhases in game['players'].items():
+                for phase, entry in playerPhases.items():
+                    self.merge(players.setdefault(name, {}), phase, entry)
+
+        return {
+            'games': len(self.games),
+            'moves': sum(game['moves'] for game in self.games),
+            'seconds': sum(entry['seconds'] for entry in phases.values()),
+            'phases': phases,
+            'players': players,
+            'perGame': self.games
+        }
+
+    @staticmethod
+    def merge(phases, phase, entry):
+        total = phases.setdefault(phase, {'calls': 0, 'seconds': 0.0})
+        total['calls'] += entry['calls']
+        total['seconds'] += entry['seconds']
+
+    def rows(self):
+        """
+        Returns:
+            rows: one row of (game, player, phase, calls, seconds) for every phase of every
+                  player of every game, followed by the totals with game set to 'all'.
+                  Player is empty for calls that belong to no player
+        """
+        rows = []
+        for game in self.games:
+            for phase, entry in game['phases'].items():
+                rows.append((game['game'], '', phase, entry['calls'], entry['seconds']))
+            for name, playerPhases in game['players'].items():
+                for phase, entry in playerPhases.items():
+                    rows.append((game['game'], name, phase, entry['calls'], entry['seconds']))
+
+        summary = self.summary()
+        for phase, entry in summary['phases'].items():
+            rows.append(('all', '', phase, entry['calls'], entry['seconds']))
+        for name, playerPhases in summary['players'].items():
+            for phase, entry in playerPhases.items():
+                rows.append(('all', name, phase, entry['calls'], entry['seconds']))
+        return rows
+
+    def writeJSON(self, path):
+        """
+        Writes the summary to a JSON file
+        """
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def writeCSV(self, path):
+        """
+        Writes the rows to a CSV file
+        """
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('game', 'player', 'phase', 'calls', 'seconds'))
+            writer.writerows(self.rows())
+
+    def report(self):
+        """
+        Returns:
+            text: a short table of where the time went, slowest phase first
+        """
+        summary = self.summary()
+        total = summary['seconds'] or 1
+        lines = [f"{summary['games']} games, {summary['moves']} moves, {summary['seconds']:.3f}s timed"]
+        for phase, entry in sorted(summary['phases'].items(), key=lambda item: item[1]['seconds'], reverse=True):
+            lines.append(f"  {phase:<13}{entry['calls']:>9} calls {entry['seconds']:>10.3f}s {100 * entry['seconds'] / total:>6.1f}%")
+        return "\n".join(lines)
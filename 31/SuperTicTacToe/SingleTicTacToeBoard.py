@@ -12,7 +12,7 @@ class SingleTicTacToeBoard:
 		self.is_full = False
 
 	def clone(self):
-		new_board = SingleTicTacToeBoard()
+		new_board = SingleTicTacToeBoard.__new__(SingleTicTacToeBoard)
 		new_board.board = [list(row) for row in self.board]
 		new_board.winner = self.winner
 		new_board.is_full = self.is_full
@@ -26,6 +26,12 @@ class SingleTicTacToeBoard:
 			elif all(cell != None for row in self.board for cell in row):
 				self.is_full = True
 
+	def unmake_move(self, row, col, mark, winner, is_full):
+		# Restores a cell and the board result to what they were before make_move
+		self.board[row][col] = mark
+		self.winner = winner
+		self.is_full = is_full
+
 	def check_winner(self, player, row, col):
 		# Check row
 		if all(self.board[row][c] == player for c in range(3)):
@@ -1,6 +1,5 @@
 from MinimaxPlayer import MinimaxPlayer
 from SuperTicTacToe.SuperTicTacToeMove import SuperTicTacToeMove
-import random
 
 MINIMAX_DEPTH = 4 # Do not change this
 
@@ -9,5 +8,5 @@ class SuperTicTacToeYOURNAMEPlayer(MinimaxPlayer):
         super().__init__("Your names here", MINIMAX_DEPTH)
 
     def scoreBoard(self, board, player):
-        return random.uniform(-1, 1)
+        return self.rng.uniform(-1, 1)
 
@@ -3,11 +3,16 @@ import random
 
 class DeckOfCards:
 
-    def __init__(self):
+    rng = random # Shuffles with the global generator unless given one
+
+    def __init__(self, rng=None):
+        if rng is not None:
+            self.rng = rng
         self.cards = []
 
     def clone(self):
-        new_deck = DeckOfCards()
+        new_deck = DeckOfCards.__new__(DeckOfCards)
+        new_deck.__dict__.update(self.__dict__)
         new_deck.cards = list(self.cards)
         return new_deck
 
@@ -15,7 +20,7 @@ class DeckOfCards:
         for suit in Card.Suit:
             for rank in Card.Rank:
                 self.cards.append(Card(suit, rank))
-        random.shuffle(self.cards);
+        self.rng.shuffle(self.cards);
 
     def draw_card(self):
         if len(self.cards) == 0:
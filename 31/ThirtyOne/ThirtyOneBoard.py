@@ -1,9 +1,9 @@
 from GameState import GameState
 from ThirtyOne.DeckOfCards import DeckOfCards
+from GameRandom import spawn_rng
 from enum import Enum
 from ThirtyOne.ThirtyOneMove import ThirtyOneDrawChoiceMove
 from ThirtyOne.ThirtyOneMove import ThirtyOneDiscardMove
-import random
 
 from TiePlayer import TiePlayer
 
@@ -18,15 +18,19 @@ class ThirtyOneBoard(GameState):
         DRAW_CHOICE = 1
         DISCARD = 2
     
-    def __init__(self, players):
+    def __init__(self, players, rng=None):
         super().__init__(players)
+        if rng is not None:
+            self.rng = rng
 
         # Basic setup
         self.hands = {player: [] for player in players}
-        self.deck = DeckOfCards()
+        self.deck = DeckOfCards(self.rng)
         self.deck.initialize_deck()
-        self.discard = DeckOfCards()
+        self.discard = DeckOfCards(self.rng)
         self.move_storage = []
+        self.history = [] # Undo records for the moves made on this board
+        self.output = True
 
         # Deal initial hands
         for _ in range(3):
@@ -39,15 +43,40 @@ class ThirtyOneBoard(GameState):
         self.player_who_knocked = -1 # index of the player who knocked, -1 if none have
         
     def clone(self):
-        newBoard = ThirtyOneBoard(self.players)
+        # Skip __init__, which would build, shuffle and deal a new deck, and copy only the live state
+        newBoard = ThirtyOneBoard.__new__(ThirtyOneBoard)
+        newBoard.__dict__.update(self.__dict__)
         newBoard.hands = {player: list(cards) for player, cards in self.hands.items()}
         newBoard.deck = self.deck.clone()
         newBoard.discard = self.discard.clone()
-        newBoard.current_player = self.current_player
-        newBoard.current_turn_type = self.current_turn_type
-        newBoard.player_who_knocked = self.player_who_knocked
-        newBoard.move_storage = [string for string in self.move_storage]
+        newBoard.move_storage = list(self.move_storage)
+        newBoard.history = []
+        # No generator until the clone reshuffles, so searching it never draws from the game's
+        newBoard.rng = None
         return newBoard
+
+    def determinize(self, player, rng=None):
+        # Other players' hands and the order of the deck are hidden
+        if rng is None:
+            rng = self.rng if self.rng is not None else GameState.rng
+        newBoard = self.clone()
+        newBoard.output = False
+        others = [other for other in self.players if other is not player]
+        unknown = list(newBoard.deck.cards)
+        for other in others:
+            unknown.extend(newBoard.hands[other])
+        rng.shuffle(unknown)
+        for other in others:
+            hand_size = len(newBoard.hands[other])
+            newBoard.hands[other] = unknown[:hand_size]
+            del unknown[:hand_size]
+        newBoard.deck.cards = unknown
+        return newBoard
+
+    def moveKey(self, move):
+        if isinstance(move, ThirtyOneDrawChoiceMove):
+            return move.choice
+        return (move.card.suit, move.card.rank)
     
     def getPossibleMoves(self):       
         if self.current_turn_type == ThirtyOneBoard.TurnType.DRAW_CHOICE:
@@ -82,10 +111,14 @@ class ThirtyOneBoard(GameState):
             return True
 
     def special_print(self, string):
-        print(string)
+        if self.output:
+            print(string)
         self.move_storage.append(string)
 
     def doMove(self, move):
+        record = [move, self.current_player, self.current_turn_type, self.player_who_knocked, len(self.move_storage), None, None, None]
+        self.history.append(record)
+
         if isinstance(move, ThirtyOneDrawChoiceMove):
             if move.choice == ThirtyOneDrawChoiceMove.Choice.DRAW_FROM_DECK:
                 self.hands[self.current_player].append(self.deck.draw_card())
@@ -100,7 +133,9 @@ class ThirtyOneBoard(GameState):
                 self.special_print (f"{self.current_player.name} has knocked.")
                 self.current_player = self.next_player()
         else:
-            self.hands[self.current_player].remove(move.card)
+            card_index = self.hands[self.current_player].index(move.card)
+            del self.hands[self.current_player][card_index]
+            record[5] = card_index
             self.discard.add_card(move.card)
             self.special_print (f"{self.current_player.name} discarded {move.card}.")
             self.current_player = self.next_player()
@@ -108,15 +143,61 @@ class ThirtyOneBoard(GameState):
 
         # Reset deck if needed
         if len(self.deck.cards) == 0:
+            record[6] = list(self.discard.cards)
+            if self.rng is None:
+                # A clone shuffles with a stream of its own, seeded by the cards it can see
+                self.rng = spawn_rng("reshuffle", *(str(card) for cards in self.hands.values() for card in cards),
+                                     *(str(card) for card in self.discard.cards))
+                record[7] = None
+            else:
+                record[7] = self.rng.getstate()
             for card in self.discard.cards:
                 self.deck.cards.append(card)
             self.deck.cards.pop()
             self.discard.cards = [self.discard.cards[-1]]
-            random.shuffle(self.deck.cards)
+            self.rng.shuffle(self.deck.cards)
             self.special_print("Shuffled the deck.")
 
         return self
-    
+
+    def undoMove(self):
+        move, player, turn_type, player_who_knocked, storage_length, card_index, discard_before_shuffle, rng_state = self.history.pop()
+        if discard_before_shuffle is not None:
+            self.deck.cards = []
+            self.discard.cards = discard_before_shuffle
+            if rng_state is None:
+                self.rng = None
+            else:
+                self.rng.setstate(rng_state)
+
+        if isinstance(move, ThirtyOneDrawChoiceMove):
+            if move.choice == ThirtyOneDrawChoiceMove.Choice.DRAW_FROM_DECK:
+                self.deck.add_card(self.hands[player].pop())
+            elif move.choice == ThirtyOneDrawChoiceMove.Choice.DRAW_FROM_DISCARD:
+                self.discard.add_card(self.hands[player].pop())
+        else:
+            self.discard.cards.pop()
+            self.hands[player].insert(card_index, move.card)
+
+        self.current_player = player
+        self.current_turn_type = turn_type
+        self.player_who_knocked = player_who_knocked
+        del self.move_storage[storage_length:]
+        return self
+
+    def hash_key(self):
+        # Cards as (suit, rank) numbers, since enums hash by name and strings hash differently in every process
+        def card_key(card):
+            return (card.suit.value, card.rank.value)
+        return hash((
+            self.players.index(self.current_player),
+            self.current_turn_type.value,
+            self.player_who_knocked,
+            tuple(frozenset(map(card_key, self.hands[player])) for player in self.players),
+            tuple(map(card_key, self.deck.cards)),
+            tuple(map(card_key, self.discard.cards))
+        ))
+
     def currentPlayer(self):
         return self.current_player
     
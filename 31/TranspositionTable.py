@@ -0,0 +1,69 @@
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Rough memory used by one filled slot (list pointer, entry tuple and its numbers)
+ENTRY_BYTES = 128
+
+
+class TranspositionTable():
+    """
+    A fixed-size table of search results, keyed by the hash_key of a game state
+    """
+
+    def __init__(self, megabytes=16):
+        """
+        Input:
+            megabytes: roughly how much memory the table may use when it is full
+        """
+        self.size = max(1, int(megabytes * 1024 * 1024) // ENTRY_BYTES)
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def clear(self):
+        """
+        Forgets every stored result
+        """
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def newSearch(self):
+        """
+        Marks the start of a new search, so results from earlier searches are
+        kept but replaced first
+        """
+        self.generation += 1
+
+    def probe(self, key):
+        """
+        Input:
+            key: the key of a position
+
+        Returns:
+            entry: a tuple of (key, depth, value, bound, move, generation), or None if
+                   the position is not stored
+        """
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, value, bound, move):
+        """
+        Stores a search result. An existing result in the same slot is only replaced
+        if it is for the same position, from an earlier search, or searched less deeply
+
+        Input:
+            key: the key of the position
+            depth: how many moves deep the position was searched
+            value: the value found
+            bound: EXACT, LOWER_BOUND or UPPER_BOUND
+            move: the best move found, or None
+        """
+        index = key % self.size
+        old = self.entries[index]
+        if old is None or old[0] == key or old[5] != self.generation or depth >= old[1]:
+            self.entries[index] = (key, depth, value, bound, move, self.generation)
+
+    def __len__(self):
+        return sum(1 for entry in self.entries if entry is not None)
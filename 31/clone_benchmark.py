@@ -0,0 +1,39 @@
+import random
+import time
+
+from RandomPlayer import RandomPlayer
+from ThirtyOne.ThirtyOneBoard import ThirtyOneBoard
+
+# Measures how fast boards clone, at the start of a game and part way through one
+# Run from this folder: python clone_benchmark.py
+
+
+def clones_per_second(board, seconds=1.0):
+    clones = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < seconds:
+        for _ in range(100):
+            board.clone()
+        clones += 100
+        elapsed = time.perf_counter() - start
+    return clones / elapsed
+
+
+def new_board(rng):
+    board = ThirtyOneBoard([RandomPlayer(f"Random {i}") for i in range(3)], rng)
+    board.output = False
+    return board
+
+
+def play(board, moves, rng):
+    # Play draws and discards without knocking, so the game keeps going
+    for _ in range(moves):
+        board.doMove(rng.choice(board.getPossibleMoves()[:2]))
+    return board
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    print(f"Start of game: {clones_per_second(new_board(rng)):>10,.0f} clones/sec")
+    print(f"Mid game:      {clones_per_second(play(new_board(rng), 20, rng)):>10,.0f} clones/sec")
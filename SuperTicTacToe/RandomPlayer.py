@@ -1,5 +1,4 @@
 import Player
-import random
 
 class RandomPlayer(Player.Player):
     def __init__(self, name):
@@ -7,4 +6,4 @@ class RandomPlayer(Player.Player):
 
     def getMove(self, board):
         valids = board.getPossibleMoves()
-        return random.choice(valids)
\ No newline at end of file
+        return self.rng.choice(valids)
\ No newline at end of file
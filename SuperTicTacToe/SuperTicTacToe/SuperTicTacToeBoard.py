@@ -6,6 +6,7 @@ from enum import Enum
 import pygame
 
 from TiePlayer import TiePlayer
+import random
 pygame.init()
 
 BLACK = 0,0,0
@@ -14,6 +15,13 @@ BLACK = 0,0,0
 NROWS = 3
 NCOLS = 3
 
+# Zobrist keys: one random number per (player, cell) and per forced board,
+# so a position's key is the XOR of the keys of everything on it
+_zobrist_random = random.Random(3)
+ZOBRIST_CELLS = [[_zobrist_random.getrandbits(64) for _ in range(81)] for _ in range(2)]
+ZOBRIST_FORCED_BOARD = [_zobrist_random.getrandbits(64) for _ in range(10)]
+ZOBRIST_SECOND_PLAYER = _zobrist_random.getrandbits(64)
+
 pygame.font.init()
 
 class SuperTicTacToeBoard(GameState):
@@ -26,17 +34,16 @@ class SuperTicTacToeBoard(GameState):
         self.sub_boards = [[SingleTicTacToeBoard() for _ in range(3)] for _ in range(3)]
         self.current_player = self.players[0]
         self.current_board = None
+        self.history = [] # Undo records for the moves made on this board
+        self.zobrist = 0 # Zobrist key of the marks on the sub boards
         
     def clone(self):
-        newBoard = SuperTicTacToeBoard(self.players[0], self.players[1])
+        # Skip __init__, which would build ten empty boards only to replace them
+        newBoard = SuperTicTacToeBoard.__new__(SuperTicTacToeBoard)
+        newBoard.__dict__.update(self.__dict__)
         newBoard.master_board = self.master_board.clone()
-        newBoard.sub_boards = []
-        for x in range(3):
-            for y in range(3):
-                if len(newBoard.sub_boards) <= x:
-                    newBoard.sub_boards.append([])
-                newBoard.sub_boards[x].append(self.sub_boards[x][y].clone())
-        newBoard.current_player = self.current_player
+        newBoard.sub_boards = [[sub_board.clone() for sub_board in row] for row in self.sub_boards]
+        newBoard.history = []
         if self.current_board is None:
             newBoard.current_board = None
         else:
@@ -80,7 +87,16 @@ class SuperTicTacToeBoard(GameState):
         raise Exception("Board not found!")
 
     def doMove(self, move):
+        sub_board = self.sub_boards[move.boardx][move.boardy]
+        mark = sub_board.board[move.positionx][move.positiony]
+        self.history.append((move, self.current_player, self.current_board, self.zobrist,
+                             mark, sub_board.winner, sub_board.is_full,
+                             self.master_board.board[move.boardx][move.boardy], self.master_board.winner, self.master_board.is_full))
+
         self.sub_boards[move.boardx][move.boardy].make_move(move.player, move.positionx, move.positiony)
+        if sub_board.board[move.positionx][move.positiony] is not mark:
+            player_index = 0 if move.player is self.players[0] else 1
+            self.zobrist ^= ZOBRIST_CELLS[player_index][(move.boardx * 3 + move.boardy) * 9 + move.positionx * 3 + move.positiony]
         if self.sub_boards[move.boardx][move.boardy].winner is not None:
             self.master_board.make_move(move.player, move.boardx, move.boardy)
 
@@ -91,6 +107,14 @@ class SuperTicTacToeBoard(GameState):
 
         self.current_player = self.next_player()
         return self
+
+    def undoMove(self):
+        move, current_player, current_board, self.zobrist, mark, winner, is_full, master_mark, master_winner, master_is_full = self.history.pop()
+        self.sub_boards[move.boardx][move.boardy].unmake_move(move.positionx, move.positiony, mark, winner, is_full)
+        self.master_board.unmake_move(move.boardx, move.boardy, master_mark, master_winner, master_is_full)
+        self.current_board = current_board
+        self.current_player = current_player
+        return self
     
     def currentPlayer(self):
         return self.current_player
@@ -100,6 +124,17 @@ class SuperTicTacToeBoard(GameState):
         next_index = (current_index + 1) % len(self.players)
         return self.players[next_index]
         
+    def hash_key(self):
+        key = self.zobrist
+        if self.current_board is not None:
+            row, col = self.get_indices(self.current_board)
+            key ^= ZOBRIST_FORCED_BOARD[row * 3 + col + 1]
+        else:
+            key ^= ZOBRIST_FORCED_BOARD[0]
+        if self.current_player is not self.players[0]:
+            key ^= ZOBRIST_SECOND_PLAYER
+        return key
+        
     def getGameEnded(self):
         if self.master_board.winner is not None:
             return self.master_board.winner
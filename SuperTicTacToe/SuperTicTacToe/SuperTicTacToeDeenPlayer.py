@@ -1,16 +1,31 @@
-from MinimaxPlayer import MinimaxPlayer
+from MinimaxPlayer import MinimaxPlayer, SearchTimeout
+from TranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND
 from SuperTicTacToe.SuperTicTacToeMove import SuperTicTacToeMove
 import multiprocessing as mp
 from functools import partial
-import random
+import time
 
 MINIMAX_DEPTH = 5
+MAX_SEARCH_DEPTH = 81  # Deepest iterative deepening can go: a game never lasts longer
 NUM_WORKERS = 8  # Adjust based on your CPU cores
 
+# Search center, then corners, then edges first so alpha-beta cuts off sooner
+CELL_ORDER = [[1, 2, 1],
+              [2, 0, 2],
+              [1, 2, 1]]
+
 class SuperTicTacToeDeenPlayer(MinimaxPlayer):
-    def __init__(self):
-        super().__init__("Parallel Minimax AI", MINIMAX_DEPTH)
+    def __init__(self, time_budget=None, table_megabytes=16):
+        """
+        With a time_budget in seconds, each move is searched by iterative deepening
+        until the time runs out; otherwise every move is searched to MINIMAX_DEPTH.
+        With table_megabytes=0 there is no transposition table and root moves are
+        searched in parallel processes instead.
+        """
+        depth = MINIMAX_DEPTH if time_budget is None else MAX_SEARCH_DEPTH
+        super().__init__("Parallel Minimax AI", depth, tableMegabytes=table_megabytes, timeBudget=time_budget)
         self.use_parallel = True  # Set to False to disable parallelization
+        self.moveOrder = _cell_order
 
     def scoreBoard(self, board, player):
         """
@@ -124,8 +139,11 @@ class SuperTicTacToeDeenPlayer(MinimaxPlayer):
     def getMove(self, board):
         """
         Override to use parallel minimax at root level.
+        With a transposition table the search runs in this process instead, since the
+        table is kept between moves so later moves start warm, and workers can't share it.
         """
-        possible_moves = board.getPossibleMoves()
+        self.startSearch(board)
+        possible_moves = self.orderedMoves(board)
         
         if not possible_moves:
             return None
@@ -133,8 +151,14 @@ class SuperTicTacToeDeenPlayer(MinimaxPlayer):
         if len(possible_moves) == 1:
             return possible_moves[0]
         
+        # A time budget is spent on one deepening search instead of parallel workers
+        if self.timeBudget is not None:
+            return self._iterative_deepening_search(board, possible_moves)
+        
         # Use parallel search if enabled and worthwhile
-        if self.use_parallel and len(possible_moves) > 4:
+        # Pool workers, like a tournament's, can't start processes of their own
+        if (self.use_parallel and self.table is None and len(possible_moves) > 4
+                and not mp.current_process().daemon):
             return self._parallel_minimax_search(board, possible_moves)
         else:
             # Fall back to sequential minimax
@@ -148,7 +172,7 @@ class SuperTicTacToeDeenPlayer(MinimaxPlayer):
             eval_func = partial(
                 _evaluate_move_wrapper,
                 board=board,
-                depth=self.max_depth - 1,
+                depth=self.depth - 1,
                 alpha=float('-inf'),
                 beta=float('inf'),
                 player=board.currentPlayer()
@@ -160,27 +184,49 @@ class SuperTicTacToeDeenPlayer(MinimaxPlayer):
         best_score = max(results)
         best_moves = [move for move, score in zip(possible_moves, results) if score == best_score]
         
-        return random.choice(best_moves)
+        return self.rng.choice(best_moves)
+    
+    def _iterative_deepening_search(self, board, possible_moves):
+        """
+        Search to depth 1, 2, 3... with the previous best move first, and return
+        the best move of the deepest search that finished within the time budget.
+        """
+        self.deadline = time.perf_counter() + self.timeBudget
+        best_move = possible_moves[0]
+        try:
+            for depth in range(1, self.depth + 1):
+                best_move = self._sequential_minimax_search(board, possible_moves, depth)
+                possible_moves.remove(best_move)
+                possible_moves.insert(0, best_move)
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return best_move
     
-    def _sequential_minimax_search(self, board, possible_moves):
+    def _sequential_minimax_search(self, board, possible_moves, depth=None):
         """Standard sequential minimax search."""
+        if depth is None:
+            depth = self.depth
         best_score = float('-inf')
         best_moves = []
         alpha = float('-inf')
         beta = float('inf')
         
+        player = board.currentPlayer()
         for move in possible_moves:
-            board_copy = board.clone()
-            board_copy.doMove(move)
-            
-            score = self._minimax(
-                board_copy,
-                self.max_depth - 1,
-                alpha,
-                beta,
-                False,
-                board.currentPlayer()
-            )
+            board.doMove(move)
+            try:
+                score = self._minimax(
+                    board,
+                    depth - 1,
+                    alpha,
+                    beta,
+                    False,
+                    player
+                )
+            finally:
+                board.undoMove()
             
             if score > best_score:
                 best_score = score
@@ -189,10 +235,12 @@ class SuperTicTacToeDeenPlayer(MinimaxPlayer):
             elif score == best_score:
                 best_moves.append(move)
         
-        return random.choice(best_moves) if best_moves else possible_moves[0]
+        return self.rng.choice(best_moves) if best_moves else possible_moves[0]
     
     def _minimax(self, board, depth, alpha, beta, maximizing, original_player):
-        """Standard minimax with alpha-beta pruning."""
+        """Standard minimax with alpha-beta pruning, searching in place with doMove/undoMove."""
+        self.checkTime()
+        
         # Check terminal conditions
         winner = board.getGameEnded()
         if winner is not False:
@@ -206,30 +254,74 @@ class SuperTicTacToeDeenPlayer(MinimaxPlayer):
         if depth == 0:
             return self.scoreBoard(board, original_player)
         
-        possible_moves = board.getPossibleMoves()
+        # Reuse what earlier searches found out about this position
+        alpha_start, beta_start = alpha, beta
+        key = self.tableKey(board, original_player)
+        table_move = None
+        if key is not None:
+            entry = self.table.probe(key)
+            if entry is not None:
+                _, entry_depth, entry_value, entry_bound, table_move, _ = entry
+                if entry_depth >= depth:
+                    if entry_bound == EXACT:
+                        return entry_value
+                    elif entry_bound == LOWER_BOUND:
+                        alpha = max(alpha, entry_value)
+                    else:
+                        beta = min(beta, entry_value)
+                    if beta <= alpha:
+                        return entry_value
+        
+        possible_moves = self.orderedMoves(board, table_move)
+        best_move = None
         
         if maximizing:
-            max_eval = float('-inf')
+            best_eval = float('-inf')
             for move in possible_moves:
-                board_copy = board.clone()
-                board_copy.doMove(move)
-                eval_score = self._minimax(board_copy, depth - 1, alpha, beta, False, original_player)
-                max_eval = max(max_eval, eval_score)
+                board.doMove(move)
+                try:
+                    eval_score = self._minimax(board, depth - 1, alpha, beta, False, original_player)
+                finally:
+                    board.undoMove()
+                if eval_score > best_eval:
+                    best_eval = eval_score
+                    best_move = move
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
                     break  # Beta cutoff
-            return max_eval
         else:
-            min_eval = float('inf')
+            best_eval = float('inf')
             for move in possible_moves:
-                board_copy = board.clone()
-                board_copy.doMove(move)
-                eval_score = self._minimax(board_copy, depth - 1, alpha, beta, True, original_player)
-                min_eval = min(min_eval, eval_score)
+                board.doMove(move)
+                try:
+                    eval_score = self._minimax(board, depth - 1, alpha, beta, True, original_player)
+                finally:
+                    board.undoMove()
+                if eval_score < best_eval:
+                    best_eval = eval_score
+                    best_move = move
                 beta = min(beta, eval_score)
                 if beta <= alpha:
                     break  # Alpha cutoff
-            return min_eval
+        
+        if key is not None:
+            if best_eval <= alpha_start:
+                bound = UPPER_BOUND
+            elif best_eval >= beta_start:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            self.table.store(key, depth, best_eval, bound, best_move)
+        return best_eval
+
+
+# =========================================================================
+# MOVE ORDERING
+# =========================================================================
+
+def _cell_order(move):
+    """Move ordering key; at module level so the player can still be pickled."""
+    return CELL_ORDER[move.positionx][move.positiony]
 
 
 # =========================================================================
@@ -241,21 +333,21 @@ def _evaluate_move_wrapper(move, board, depth, alpha, beta, player):
     Wrapper function for parallel move evaluation.
     Must be at module level for multiprocessing to pickle it.
     """
-    # Create a temporary player instance for evaluation
-    temp_player = SuperTicTacToeDeenPlayer()
+    # Create a temporary player instance for evaluation, without a table like the one that sent it
+    temp_player = SuperTicTacToeDeenPlayer(table_megabytes=0)
     
-    # Clone board and make move
-    board_copy = board.clone()
-    board_copy.doMove(move)
+    # Search in place on this worker's copy of the board
+    board.doMove(move)
     
     # Evaluate with minimax
     score = temp_player._minimax(
-        board_copy,
+        board,
         depth,
         alpha,
         beta,
         False,  # After our move, opponent's turn (minimizing)
         player
     )
+    board.undoMove()
     
-    return score
\ No newline at end of file
+    return score
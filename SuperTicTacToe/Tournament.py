@@ -0,0 +1,219 @@
+import itertools
+import math
+import os
+from multiprocessing import Pool
+
+from GameEngine import GameEngine
+from GameRandom import spawn_seed
+from TiePlayer import TiePlayer
+
+ROUND_ROBIN = 'round_robin'
+SWISS = 'swiss'
+
+
+def play_match(task):
+    """
+    Plays one match in a worker: the same lineup once in every rotation of the seats
+
+    Input:
+        task: a tuple of (match, lineup, factories, boardFactory, gamesPerSeating, seed), where
+              lineup is the entrant numbers in their first seats and factories build their players
+
+    Returns:
+        result: a map with the match number, the lineup, and a map of entrant numbers to
+                their points, wins, ties, games, score total and results per seat
+    """
+    match, lineup, factories, boardFactory, gamesPerSeating, seed = task
+    factoryOf = dict(zip(lineup, factories))
+    seats = len(lineup)
+    stats = {entrant: {'points': 0, 'wins': 0, 'ties': 0, 'games': 0, 'score': 0,
+                       'seats': [{'games': 0, 'wins': 0, 'points': 0} for _ in range(seats)]}
+             for entrant in lineup}
+
+    engine = GameEngine(None)
+    for rotation in range(seats):
+        # Rotate the lineup so every entrant plays every seat the same number of times
+        seating = lineup[rotation:] + lineup[:rotation]
+        players = [factoryOf[entrant]() for entrant in seating]
+        entrantOf = {player: entrant for player, entrant in zip(players, seating)}
+
+        def newBoard(index, rng):
+            return boardFactory(players, rng)
+
+        def count(index, board, winner):
+            scores = board.scoreBoard()
+            for seat, player in enumerate(players):
+                entrant = stats[entrantOf[player]]
+                # Place points like run_many_times: one per player scored below you, ties share
+                points = 1 + sum(1 for other in players if scores[other] < scores[player])
+                won = winner is player
+                entrant['points'] += points
+                entrant['wins'] += won
+                entrant['ties'] += isinstance(winner, TiePlayer) and player in winner.players
+                entrant['games'] += 1
+                entrant['score'] += scores[player]
+                entrant['seats'][seat]['games'] += 1
+                entrant['seats'][seat]['wins'] += won
+                entrant['seats'][seat]['points'] += points
+
+        gameSeed = None if seed is None else spawn_seed(seed, 'match', match, 'rotation', rotation)
+        engine.run_batch(newBoard, gamesPerSeating, count, gameSeed)
+
+    return {'match': match, 'lineup': lineup, 'stats': stats}
+
+
+class Tournament():
+    """
+    A league of bots that play each other across a process pool.
+    Round robin plays every lineup of seatsPerGame entrants once; Swiss plays a number
+    of rounds, each time seating entrants with similar points together.
+    Every match is played once in each rotation of the seats, so no entrant keeps
+    the advantage or disadvantage of one seat, and match results stream back as they finish.
+    """
+
+    def __init__(self, factories, boardFactory, seatsPerGame, gamesPerSeating=1, numWorkers=None,
+                 seed=None, format=ROUND_ROBIN, rounds=None):
+        """
+        Input:
+            factories: a list of functions that each build a fresh player for one entrant.
+                       With more than one worker they are sent to other processes,
+                       so they must be module-level functions or functools.partial objects
+            boardFactory: a function that takes a list of players in seat order and a random
+                          number generator (or None) and returns a fresh gamestate
+            seatsPerGame: the number of players in each game
+            gamesPerSeating: the number of games played in each rotation of a match
+            numWorkers: the number of worker processes, every core by default.
+                        With one worker, matches are played in this process
+            seed: optional root seed. Each match then depends only on the seed and its number,
+                  so the standings are the same for any number of workers
+            format: ROUND_ROBIN or SWISS
+            rounds: the number of Swiss rounds, enough to separate the entrants by default
+        """
+        if len(factories) < seatsPerGame:
+            raise ValueError(f"A tournament of {seatsPerGame}-player games needs at least {seatsPerGame} entrants")
+        if format not in (ROUND_ROBIN, SWISS):
+            raise ValueError(f"Unknown tournament format {format}")
+        self.factories = list(factories)
+        self.boardFactory = boardFactory
+        self.seatsPerGame = seatsPerGame
+        self.gamesPerSeating = gamesPerSeating
+        self.numWorkers = numWorkers or os.cpu_count() or 1
+        self.seed = seed
+        self.format = format
+        self.rounds = rounds if rounds is not None else max(1, math.ceil(math.log2(len(factories))))
+
+        self.names = [factory().name for factory in self.factories]
+        self.standings = [{'entrant': entrant, 'name': name, 'points': 0, 'wins': 0, 'ties': 0,
+                           'games': 0, 'score': 0, 'matches': 0,
+                           'seats': [{'games': 0, 'wins': 0, 'points': 0} for _ in range(seatsPerGame)]}
+                          for entrant, name in enumerate(self.names)]
+        self.opponents = [set() for _ in self.factories]
+        self.matchesPlayed = 0
+
+    def roundRobinLineups(self):
+        """
+        Returns:
+            lineups: every group of seatsPerGame entrants, each once
+        """
+        return [list(lineup) for lineup in itertools.combinations(range(len(self.factories)), self.seatsPerGame)]
+
+    def swissLineups(self):
+        """
+        Returns:
+            lineups: the entrants seated in tables of similar points, avoiding opponents they
+                     have already met where possible. Entrants left over sit the round out
+        """
+        order = sorted(range(len(self.factories)), key=lambda entrant: (-self.standings[entrant]['points'], entrant))
+        lineups = []
+        while len(order) >= self.seatsPerGame:
+            table = [order.pop(0)]
+            while len(table) < self.seatsPerGame:
+                fresh = [entrant for entrant in order if not any(entrant in self.opponents[seated] for seated in table)]
+                entrant = fresh[0] if fresh else order[0]
+                order.remove(entrant)
+                table.append(entrant)
+            lineups.append(table)
+        return lineups
+
+    def play(self, lineups, pool):
+        """
+        Plays a list of lineups and yields each match result as soon as it finishes
+        """
+        tasks = []
+        for lineup in lineups:
+            factories = [self.factories[entrant] for entrant in lineup]
+            tasks.append((self.matchesPlayed, lineup, factories, self.boardFactory, self.gamesPerSeating, self.seed))
+            self.matchesPlayed += 1
+
+        results = map(play_match, tasks) if pool is None else pool.imap_unordered(play_match, tasks)
+        for result in results:
+            self.record(result)
+            yield result
+
+    def record(self, result):
+        """
+        Adds the result of one match to the standings
+        """
+        for entrant, stats in result['stats'].items():
+            standing = self.standings[entrant]
+            for key in ('points', 'wins', 'ties', 'games', 'score'):
+                standing[key] += stats[key]
+            standing['matches'] += 1
+            for total, seat in zip(standing['seats'], stats['seats']):
+                for key in total:
+                    total[key] += seat[key]
+            self.opponents[entrant].update(other for other in result['lineup'] if other != entrant)
+
+    def results(self):
+        """
+        Plays the whole tournament
+
+        Returns:
+            A generator of match results, in the order they finish. The standings are
+            up to date with every result when it is yielded
+        """
+        pool = Pool(processes=self.numWorkers) if self.numWorkers > 1 else None
+        try:
+            if self.format == ROUND_ROBIN:
+                yield from self.play(self.roundRobinLineups(), pool)
+            else:
+                for _ in range(self.rounds):
+                    yield from self.play(self.swissLineups(), pool)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def run(self, callback=None):
+        """
+        Plays the whole tournament
+
+        Input:
+            callback: optional function called as callback(result, tournament) after every match
+
+        Returns:
+            standings: the final standings, best first
+        """
+        for result in self.results():
+            if callback is not None:
+                callback(result, self)
+        return self.ranking()
+
+    def ranking(self):
+        """
+        Returns:
+            standings: the standings sorted by points, then wins, then entrant number
+        """
+        return sorted(self.standings, key=lambda standing: (-standing['points'], -standing['wins'], standing['entrant']))
+
+    def report(self):
+        """
+        Returns:
+            text: a table of the standings with the average points from every seat
+        """
+        seatHeaders = "".join(f"{'seat ' + str(seat + 1):>8}" for seat in range(self.seatsPerGame))
+        lines = [f"{'':>3} {'player':<24}{'points':>8}{'wins':>7}{'ties':>6}{'games':>7}{seatHeaders}"]
+        for place, standing in enumerate(self.ranking()):
+            seats = "".join(f"{seat['points'] / seat['games'] if seat['games'] else 0:>8.2f}" for seat in standing['seats'])
+            lines.append(f"{place + 1:>3} {standing['name'][:24]:<24}{standing['points']:>8}{standing['wins']:>7}"
+                         f"{standing['ties']:>6}{standing['games']:>7}{seats}")
+        return "\n".join(lines)
@@ -0,0 +1,36 @@
+import random
+import time
+
+from RandomPlayer import RandomPlayer
+from SuperTicTacToe.SuperTicTacToeBoard import SuperTicTacToeBoard
+
+# Measures how fast boards clone, at the start of a game and part way through one
+# Run from this folder: python clone_benchmark.py
+
+
+def clones_per_second(board, seconds=1.0):
+    clones = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < seconds:
+        for _ in range(100):
+            board.clone()
+        clones += 100
+        elapsed = time.perf_counter() - start
+    return clones / elapsed
+
+
+def new_board():
+    return SuperTicTacToeBoard(RandomPlayer("Random 1"), RandomPlayer("Random 2"))
+
+
+def play(board, moves, rng):
+    for _ in range(moves):
+        board.doMove(rng.choice(board.getPossibleMoves()))
+    return board
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    print(f"Start of game: {clones_per_second(new_board()):>10,.0f} clones/sec")
+    print(f"Mid game:      {clones_per_second(play(new_board(), 20, rng)):>10,.0f} clones/sec")
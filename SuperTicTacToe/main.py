@@ -1,5 +1,6 @@
 from GameEngine import GameEngine
 from RandomPlayer import RandomPlayer
+from Tournament import Tournament, ROUND_ROBIN
 from TiePlayer import TiePlayer
 
 from SuperTicTacToe.SuperTicTacToeBoard import SuperTicTacToeBoard
@@ -9,30 +10,30 @@ from SuperTicTacToe.SuperTicTacToeDeenPlayer import SuperTicTacToeDeenPlayer
 
 #import all files in ThirtyOne/StudentFiles here
 
+# Functions or functools.partial objects that each build one bot for the league
 all_players = []
 
 def set_seeds():
-    scores = run_game(all_players)
-
-    run_many_times(all_players, 10)
+    run_league(all_players, 5)
     # sorted_scores = dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
 
     # for item in sorted_scores.items():
     #     print(f"Player {item[0].name}: {item[1]} points")
 
-def run_many_times(players, nTimes):
-    score_count = {player: 0 for player in players}
-    for i in range(nTimes):
-        scores = run_game(players)
-        sorted_scores = dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
-        counter = len(players)
-        for item in sorted_scores.items():
-            score_count[item[0]] += counter
-            counter -= 1
-            
-    score_count = dict(sorted(score_count.items(), key=lambda item: item[1], reverse=True))
-    for player in score_count:
-        print(f"Player {player.name}: {score_count[player]} total points over {nTimes} games")
+def new_league_board(players, rng):
+    return SuperTicTacToeBoard(players[0], players[1])
+
+def run_league(factories, games_per_seating = 1, num_workers = None, seed = None, format = ROUND_ROBIN):
+    # Every pair of bots plays games_per_seating games with each bot going first, across a process pool
+    # factories build the bots inside the workers, so they must be module-level functions or partials
+    tournament = Tournament(factories, new_league_board, 2, games_per_seating, num_workers, seed, format)
+
+    def progress(result, tournament):
+        print(f"Match {result['match'] + 1}: " + " vs ".join(tournament.names[entrant] for entrant in result['lineup']))
+
+    standings = tournament.run(progress)
+    print(tournament.report())
+    return standings
 
 def run_game(players):
     board = SuperTicTacToeBoard(players[0], players[1])
@@ -1,4 +1,5 @@
 from GameEngine import GameEngine
+from GameProfiler import GameProfiler
 from RandomPlayer import RandomPlayer
 from TiePlayer import TiePlayer
 
@@ -7,7 +8,7 @@ from SuperTicTacToe.SuperTicTacToeHumanPlayer import SuperTicTacToeHumanPlayer
 from SuperTicTacToe.SuperTicTacToeYOURNAMEPlayer import SuperTicTacToeYOURNAMEPlayer
 from SuperTicTacToe.SuperTicTacToeDeenPlayer import SuperTicTacToeDeenPlayer
 
-def run_test_suite(num_games=100):
+def run_test_suite(num_games=100, profile_path=None, seed=None):
     # Initialize your model and the opponent
     # Testing against RandomPlayer is standard for a baseline win rate
     my_model = SuperTicTacToeDeenPlayer()
@@ -22,28 +23,31 @@ def run_test_suite(num_games=100):
 
     print(f"Starting benchmark: {num_games} games...")
 
-    for i in range(num_games):
+    def new_board(index, rng):
         # We alternate who goes first each game for a fair test
-        p1, p2 = (players[0], players[1]) if i % 2 == 0 else (players[1], players[0])
-        
-        board = SuperTicTacToeBoard(p1, p2)
-        engine = GameEngine(board)
-
-        # Set run(False) to disable the interface for maximum speed
-        winner = engine.run(True)
+        p1, p2 = (players[0], players[1]) if index % 2 == 0 else (players[1], players[0])
+        return SuperTicTacToeBoard(p1, p2)
 
+    def count_result(index, board, winner):
         if winner == my_model:
             stats["wins"] += 1
-        elif winner is None:
+        elif isinstance(winner, TiePlayer):
             stats["ties"] += 1
         else:
             stats["losses"] += 1
 
         # Optional: Print progress every 10 games
-        if (i + 1) % 1 == 0:
-            print(f"Completed {i + 1}/{num_games} games...")
+        if (index + 1) % 1 == 0:
+            print(f"Completed {index + 1}/{num_games} games...")
             print(stats)
 
+    # run_batch plays without the interface for maximum speed
+    # Pass profile_path to time every phase of every move and save <path>.json and <path>.csv
+    profiler = GameProfiler() if profile_path else None
+    # Pass a seed to make every game reproducible; replay game i with
+    # GameEngine(None).replay(new_board, seed, i)
+    results = GameEngine(None, profiler).run_batch(new_board, num_games, count_result, seed)
+
     # Calculate Results
     win_rate = (stats["wins"] / num_games) * 100
     
@@ -55,7 +59,12 @@ def run_test_suite(num_games=100):
     print(f"Losses:      {stats['losses']}")
     print(f"Ties:        {stats['ties']}")
     print(f"Win Rate:    {win_rate:.2f}%")
+    print(f"Games/sec:   {results['games_per_sec']:.2f}")
     print("="*30)
+    if profiler is not None:
+        print(profiler.report())
+        profiler.writeJSON(profile_path + ".json")
+        profiler.writeCSV(profile_path + ".csv")
 
 if __name__ == "__main__":
     run_test_suite(100)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import json
+import os
+import pickle
+import time
+
+# Saving long searches as they go, so a crash or preemption only loses the work in flight:
+# results are appended one JSON object per line, and search state is pickled to a checkpoint
+
+
+class ResultLog():
+    """
+    Appends results to a JSON lines file. Lines are written as they arrive but only forced to
+    disk every syncEvery records or syncSeconds seconds, as an fsync per result would be slow
+    """
+
+    def __init__(self, path, append=True, syncEvery=100, syncSeconds=5.0):
+        """
+        Input:
+            path: the JSON lines file
+            append: False to start the file again, True to add to what it holds
+            syncEvery: the most records to write between fsyncs
+            syncSeconds: the most seconds between fsyncs
+        """
+        self.path = path
+        self.syncEvery = syncEvery
+        self.syncSeconds = syncSeconds
+        self.file = open(path, 'a' if append else 'w')
+        self.pending = 0
+        self.lastSync = time.monotonic()
+
+    def write(self, record):
+        """
+        Input:
+            record: a JSON serializable object, written as one line
+        """
+        self.file.write(json.dumps(record) + "\n")
+        self.pending += 1
+        if self.pending >= self.syncEvery or time.monotonic() - self.lastSync >= self.syncSeconds:
+            self.sync()
+
+    def sync(self):
+        """
+        Forces every record written so far to disk
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.lastSync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+
+def read_results(path):
+    """
+    Input:
+        path: a JSON lines file written by ResultLog
+
+    Returns:
+        records: every complete record in the file, in order, or [] if there is no file.
+                 A line cut short by a crash at the end of the file is left out
+    """
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+def repair_results(path):
+    """
+    Cuts off a line left unfinished by a crash, so records appended after it start on their own line
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+
+
+def save_checkpoint(path, state):
+    """
+    Pickles state to a temporary file and then moves it over path, so an interrupted save
+    leaves the previous checkpoint in place
+    """
+    temporary = path + ".tmp"
+    with open(temporary, 'wb') as f:
+        pickle.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    """
+    Returns:
+        state: the state saved at path, or None if there is no checkpoint
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,75 @@
+import json
+import os
+
+
+class FitnessStore():
+    """
+    Wins and games of every configuration ever evaluated, so a configuration that comes back
+    in a later generation or a later run adds games to its tally instead of starting over.
+    The tallies are saved with the opponents they were played against and a version, and a
+    file saved under different ones is not loaded, since its results would not be comparable
+    """
+
+    def __init__(self, path=None, opponents="", version=""):
+        """
+        Input:
+            path: optional JSON file to load from and save to
+            opponents: a description of who the configurations play against
+            version: the version of the game and players; change it when they change
+        """
+        self.path = path
+        self.opponents = opponents
+        self.version = version
+        self.tallies = {}
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path) as f:
+            saved = json.load(f)
+        if saved.get('opponents') != self.opponents or saved.get('version') != self.version:
+            print(f"Not loading {self.path}: it was played against {saved.get('opponents')!r}, "
+                  f"version {saved.get('version')!r}")
+            return
+        self.tallies = {key: list(tally) for key, tally in saved['tallies'].items()}
+
+    def save(self):
+        """
+        Writes the tallies to a temporary file first, so an interrupted save leaves the old file
+        """
+        if self.path is None:
+            return
+        temporary = self.path + ".tmp"
+        with open(temporary, 'w') as f:
+            json.dump({'opponents': self.opponents, 'version': self.version, 'tallies': self.tallies}, f)
+        os.replace(temporary, self.path)
+
+    @staticmethod
+    def key(config):
+        """
+        Input:
+            config: a map of Card.Type to priority
+
+        Returns:
+            key: the card types from first to last priority, the same for every equal config
+        """
+        return ">".join(card_type.name for card_type, _ in sorted(config.items(), key=lambda item: item[1]))
+
+    def get(self, key):
+        """
+        Returns:
+            wins, games: the tally of key, zeros if it has not been played
+        """
+        return tuple(self.tallies.get(key, (0, 0)))
+
+    def add(self, key, wins, games):
+        tally = self.tallies.setdefault(key, [0, 0])
+        tally[0] += wins
+        tally[1] += games
+
+    def win_rate(self, key):
+        wins, games = self.get(key)
+        return wins / games if games else 0
+
+    def __len__(self):
+        return len(self.tallies)
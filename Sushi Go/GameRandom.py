@@ -0,0 +1,30 @@
+import random
+
+# Random streams for reproducible games
+# Every stream is named by a root seed and a path under it, like (seed, game index, "board"),
+# so a game draws the same numbers in any process, in any order and with any number of workers
+
+
+def spawn_seed(seed, *path):
+    """
+    Input:
+        seed: the root seed of a run, an int or a string
+        path: ints or strings naming a child under the root, like a generation or a game index
+
+    Returns:
+        seed: a seed for the child, which can be spawned from again
+    """
+    return "/".join(str(part) for part in (seed,) + path)
+
+
+def spawn_rng(seed, *path):
+    """
+    Input:
+        seed: the root seed of a run, an int or a string
+        path: ints or strings naming the stream under the root
+
+    Returns:
+        rng: a random.Random whose numbers depend only on the seed and the path
+    """
+    # String seeds are hashed with SHA-512, so they don't depend on PYTHONHASHSEED
+    return random.Random(spawn_seed(seed, *path))
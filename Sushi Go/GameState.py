@@ -1,7 +1,14 @@
+import random
+
 class GameState():
     """
     A base class of the state of the game, including the board and the player whose turn it is
     """
+
+    # Random number generator for everything the game leaves to chance
+    # A board given its own stream sets self.rng; otherwise it shares the global one
+    rng = random
+
     def __init__(self, players):
         self.players = players
         pass
@@ -13,6 +20,30 @@ class GameState():
         """
         pass
     
+    def determinize(self, player, rng=None):
+        """
+        Input:
+            player: the player whose point of view is kept
+            rng: optional random number generator used to guess hidden information,
+                 the board's own by default
+
+        Returns:
+            board: a clone of the current board in which everything the player
+                   can't see is replaced by a random guess consistent with what they can see
+        """
+        return self.clone()
+
+    def moveKey(self, move):
+        """
+        Input:
+            move: a possible move
+
+        Returns:
+            key: a hashable key for the move, equal for moves that look the same
+                 to other players in every determinization
+        """
+        return tuple(vars(move).values())
+    
     def getNextMove(self):
         """
         Returns:
@@ -33,13 +64,7 @@ class GameState():
             possibleBoards: a list of all possible boards
         """
         
-        possibleBoards = []
-        possibleMoves = self.getPossibleMoves()
-        for move in possibleMoves:
-            newBoard = self.clone()
-            newBoard.doMove(move)
-            possibleBoards.append(newBoard)
-        return possibleBoards
+        return list(self.generatePossibleBoards())
 
     def getPossibleBoardsAndMoves(self):
         """
@@ -47,13 +72,37 @@ class GameState():
             A list of ordered pairs of boards and moves
         """
         
-        possibleBoards = []
+        return list(self.generatePossibleBoardsAndMoves())
+
+    def generatePossibleBoards(self, key=None):
+        """
+        Input:
+            key: optional function of a move, used to order the moves before any board is built
+
+        Returns:
+            A generator of possible boards, each cloned only when the caller reaches it
+        """
+
+        for newBoard, move in self.generatePossibleBoardsAndMoves(key):
+            yield newBoard
+
+    def generatePossibleBoardsAndMoves(self, key=None):
+        """
+        Input:
+            key: optional function of a move, used to order the moves before any board is built
+
+        Returns:
+            A generator of ordered pairs of boards and moves, each board cloned only when
+            the caller reaches it, so a search that stops early never builds the rest
+        """
+
         possibleMoves = self.getPossibleMoves()
+        if key is not None:
+            possibleMoves = sorted(possibleMoves, key=key)
         for move in possibleMoves:
             newBoard = self.clone()
             newBoard.doMove(move)
-            possibleBoards.append((newBoard, move))
-        return possibleBoards
+            yield newBoard, move
 
     def checkIsValid(self, move):
         """
@@ -78,6 +127,32 @@ class GameState():
             move: action taken by current player
         """
         pass
+
+    def moveWeight(self, move):
+        """
+        Input:
+            move: one of getPossibleMoves
+
+        Returns:
+            weight: how many of the game's basic moves this move stands for, for games whose
+                    getPossibleMoves merges moves that play out the same; 1 otherwise
+        """
+        return 1
+
+    def undoMove(self):
+        """
+        Reverts the most recent doMove made on this board, so searches can
+        explore moves in place instead of cloning every child board
+        """
+        pass
+    
+    def hash_key(self):
+        """
+        Returns:
+            key: an integer that identifies this position, the same however the position
+                 was reached, or None if this game does not support hashing
+        """
+        return None
     
     def getGameEnded(self):
         """
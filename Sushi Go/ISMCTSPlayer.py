@@ -0,0 +1,121 @@
+from Player import Player
+import math
+import time
+
+from TiePlayer import TiePlayer
+
+
+class ISMCTSNode():
+    """
+    A node of the information set search tree, reached by a move that looks the same
+    in every determinization
+    """
+
+    def __init__(self, parent, moveKey, playerJustMoved):
+        self.parent = parent
+        self.moveKey = moveKey
+        self.playerJustMoved = playerJustMoved
+        self.children = {}
+        self.visits = 0
+        self.availability = 0
+        self.reward = 0.0
+
+    def selectChild(self, availableKeys, exploration):
+        """
+        Picks the available child with the best upper confidence bound, counting
+        visits against how often each child could have been chosen
+        """
+        bestChild = None
+        bestValue = float("-inf")
+        for key in availableKeys:
+            child = self.children[key]
+            value = child.reward / child.visits + exploration * math.sqrt(math.log(child.availability) / child.visits)
+            if value > bestValue:
+                bestChild = child
+                bestValue = value
+        return bestChild
+
+
+class ISMCTSPlayer(Player):
+    """
+    Information set Monte Carlo tree search for games with hidden information.
+    Every iteration samples a determinization of what this player can't see,
+    walks the shared tree with UCT, plays randomly to the end and backs up the result.
+    Stops after a number of iterations or a number of seconds, whichever comes first.
+    """
+
+    def __init__(self, name, iterations=1000, timeBudget=None, exploration=0.7, rng=None):
+        super().__init__(name)
+        self.iterations = iterations
+        self.timeBudget = timeBudget
+        self.exploration = exploration
+        if rng is not None:
+            self.rng = rng
+
+    def getMove(self, board):
+        root = ISMCTSNode(None, None, None)
+        deadline = None if self.timeBudget is None else time.perf_counter() + self.timeBudget
+
+        iteration = 0
+        while self.iterations is None or iteration < self.iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self.runIteration(root, board.determinize(self, self.rng))
+            iteration += 1
+
+        moves = {board.moveKey(move): move for move in board.getPossibleMoves()}
+        visited = [child for key, child in root.children.items() if key in moves]
+        if not visited:
+            return self.rng.choice(list(moves.values()))
+        best = max(visited, key=lambda child: child.visits)
+        return moves[best.moveKey]
+
+    def runIteration(self, root, state):
+        node = root
+
+        # Select and expand
+        while not state.getGameEnded():
+            moves = {state.moveKey(move): move for move in state.getPossibleMoves()}
+            if not moves:
+                break
+            for key in moves:
+                if key in node.children:
+                    node.children[key].availability += 1
+
+            untried = [key for key in moves if key not in node.children]
+            mover = state.currentPlayer()
+            if untried:
+                key = self.rng.choice(untried)
+                child = ISMCTSNode(node, key, mover)
+                child.availability = 1
+                node.children[key] = child
+                state.doMove(moves[key])
+                node = child
+                break
+
+            node = node.selectChild(moves.keys(), self.exploration)
+            state.doMove(moves[node.moveKey])
+
+        # Simulate
+        while not state.getGameEnded():
+            moves = state.getPossibleMoves()
+            if not moves:
+                break
+            state.doMove(self.rng.choice(moves))
+
+        # Backpropagate
+        rewards = self.getRewards(state)
+        while node is not None:
+            node.visits += 1
+            if node.playerJustMoved is not None:
+                node.reward += rewards.get(node.playerJustMoved, 0)
+            node = node.parent
+
+# Reward each player for a finished game: 1 for a win, shared between tied players
+    def getRewards(self, state):
+        winner = state.getGameEnded()
+        if isinstance(winner, TiePlayer):
+            return {player: 1 / len(winner.players) for player in winner.players}
+        if winner:
+            return {winner: 1}
+        return {}
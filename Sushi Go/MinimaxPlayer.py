@@ -1,50 +1,166 @@
 from Player import Player
-import random
+import time
 
 from TiePlayer import TiePlayer
+from TranspositionTable import TranspositionTable, EXACT
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out
+    """
+    pass
 
 class MinimaxPlayer(Player):
-    def __init__(self, name, depth):
+    def __init__(self, name, depth, tableMegabytes=16, timeBudget=None):
         super().__init__(name)
         self.depth = depth
+        self.moveOrder = None # Optional key function of a move, to search promising moves first
+
+        # With a time budget, search depth 1, 2, 3... up to depth until the time runs out
+        self.timeBudget = timeBudget
+        self.searchDepth = depth
+        self.firstMove = None
+        self.deadline = None
+
+        # Results of earlier searches, kept between moves of the same game
+        # Only used for games whose boards implement hash_key
+        self.table = TranspositionTable(tableMegabytes) if tableMegabytes else None
+        self.tablePlayers = None
+
+    def __getstate__(self):
+        # The table only helps in this process, so don't copy it into worker processes
+        state = self.__dict__.copy()
+        state['table'] = None
+        return state
 
     def getMove(self, board):
+        self.startSearch(board)
+        if self.timeBudget is not None:
+            return self.iterativeDeepening(board)
+        self.searchDepth = self.depth
         newMove, value = self.maximizeBoard(board, 0, self)
         return newMove
+
+# Search deeper and deeper until the time budget runs out, searching the best move
+# of the last iteration first, and return the best move of the deepest finished iteration
+# A search that runs out of time takes its moves back as it unwinds, so the board is left as it was
+    def iterativeDeepening(self, board):
+        # If not even depth 1 finishes, play the first move in search order
+        fallback = self.orderedMoves(board)[0]
+        self.deadline = time.perf_counter() + self.timeBudget
+        bestMove = None
+        try:
+            for depth in range(1, self.depth + 1):
+                self.searchDepth = depth
+                self.firstMove = bestMove
+                bestMove, value = self.maximizeBoard(board, 0, self)
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+            self.firstMove = None
+            self.searchDepth = self.depth
+
+        if bestMove is None:
+            bestMove = fallback
+        return bestMove
+
+# Stop the search if its time is up
+    def checkTime(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+# Get the table ready for a new search
+# Stored moves name their players, so a game with different seats starts empty
+    def startSearch(self, board):
+        if self.table is None:
+            return
+        players = tuple(board.players)
+        if players != self.tablePlayers:
+            self.table.clear()
+            self.tablePlayers = players
+        self.table.newSearch()
+
+# Get the key of a board searched on behalf of a player, or None if it can't be stored
+    def tableKey(self, board, player):
+        if self.table is None:
+            return None
+        key = board.hash_key()
+        if key is None:
+            return None
+        return hash((key, board.players.index(player)))
         
 # Get maximum value possible on board
 # Returns as ordered pair of move and value
     def maximizeBoard(self, board, depth, player):
+        self.checkTime()
         ended = board.getGameEnded()
         if ended:
             result = board.scoreBoard()
             return None, result[player]
 
-        if depth >= self.depth:
+        if depth >= self.searchDepth:
             return None, self.scoreBoard(board, player)
 
+        remaining = self.searchDepth - depth
+        key = self.tableKey(board, player)
+        tableMove = None
+        if key is not None:
+            entry = self.table.probe(key)
+            if entry is not None:
+                if entry[1] >= remaining:
+                    return entry[4], entry[2]
+                tableMove = entry[4]
+
+        # Search in place: apply each move, recurse, then take it back
         currentPlayer = board.currentPlayer()
-        options = board.getPossibleBoardsAndMoves()
-        bestOptions = []
+        if depth == 0 and self.firstMove is not None:
+            tableMove = self.firstMove
+        moves = self.orderedMoves(board, tableMove)
+        bestMoves = []
         bestValue = float("-inf")
-        for option in options:
-            newMove, value = self.maximizeBoard(option[0], depth + 1, currentPlayer)
+        for move in moves:
+            board.doMove(move)
+            try:
+                newMove, value = self.maximizeBoard(board, depth + 1, currentPlayer)
+            finally:
+                board.undoMove()
             #value = -value
-            # if currentPlayer != option[0].currentPlayer():
+            # if currentPlayer != board.currentPlayer():
             #     value = -value
             if value > bestValue:
-                bestOptions = [option]
+                bestMoves = [move]
                 bestValue = value
             elif value == bestValue:
-                bestOptions.append(option)
+                bestMoves.append(move)
+
+        bestMoves.sort(key=lambda move: self.scoreMove(board, move, player), reverse=True)
+
+        if key is not None:
+            self.table.store(key, remaining, -bestValue, EXACT, bestMoves[0])
+        return bestMoves[0], -bestValue
 
-        bestOptions.sort(key=lambda x: self.scoreBoard(x[0], player), reverse=True)
+# Get the moves to search on a board, sorted by moveOrder if there is one
+# A move that was best in an earlier search goes first
+    def orderedMoves(self, board, firstMove=None):
+        moves = board.getPossibleMoves()
+        if self.moveOrder is not None:
+            moves.sort(key=self.moveOrder)
+        if firstMove is not None and firstMove in moves:
+            moves.remove(firstMove)
+            moves.insert(0, firstMove)
+        return moves
 
-        return bestOptions[0][1], -bestValue
+# Score the board that a move leads to, without keeping it
+    def scoreMove(self, board, move, player):
+        board.doMove(move)
+        score = self.scoreBoard(board, player)
+        board.undoMove()
+        return score
     
 # Assign a score to a board
 # By default, just a random number
 # But you need to change this
     def scoreBoard(self, board, player):
-        return random.uniform(-1, 1)
+        return self.rng.uniform(-1, 1)
         
\ No newline at end of file
@@ -1,7 +1,13 @@
+import random
+
 class Player():
     """
     Base class of a player of the game, which can be a person, a computer, or something in between
     """
+
+    # Random number generator for the player's choices
+    # GameEngine gives every seat its own stream in seeded games; otherwise it is the global one
+    rng = random
     
     def __init__(self, name):
         self.name = name
@@ -1,10 +1,11 @@
 import Player
-import random
 
 class RandomPlayer(Player.Player):
     def __init__(self, name):
         super().__init__(name)
 
     def getMove(self, board):
+        # Merged moves count as many times as the moves they stand for, so a random player
+        # picks the same way however a game groups its moves
         valids = board.getPossibleMoves()
-        return random.choice(valids)
\ No newline at end of file
+        return self.rng.choices(valids, weights=[board.moveWeight(move) for move in valids])[0]
\ No newline at end of file
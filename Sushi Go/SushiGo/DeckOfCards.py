@@ -3,12 +3,18 @@ import random
 
 class DeckOfCards:
 
-    def __init__(self):
+    rng = random # Shuffles with the global generator unless given one
+
+    def __init__(self, rng=None):
+        if rng is not None:
+            self.rng = rng
         self.cards = []
         self.initialize_deck()
 
     def clone(self):
-        new_deck = DeckOfCards()
+        # Skip __init__, which would build and shuffle a whole new deck
+        new_deck = DeckOfCards.__new__(DeckOfCards)
+        new_deck.__dict__.update(self.__dict__)
         new_deck.cards = list(self.cards)
         return new_deck
 
@@ -30,7 +36,7 @@ class DeckOfCards:
         for card_type, amount in card_amounts.items():
             for _ in range(amount):
                 self.cards.append(Card(card_type))
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
 
     def draw_card(self):
         if len(self.cards) == 0:
@@ -3,6 +3,7 @@ from GameState import GameState
 from SushiGo.DeckOfCards import DeckOfCards
 from SushiGo.Card import Card
 from SushiGo.SushiGoMove import SushiGoMove
+from SushiGo.SushiGoCountBoard import SushiGoCountBoard, NUM_TYPES, TEMPURA, SASHIMI, DUMPLING, PUDDING, WASABI, CHOPSTICKS, NIGIRI_SCORES
 
 from TiePlayer import TiePlayer
 
@@ -11,18 +12,34 @@ RED = 255,0,0
 BLUE = 0,0,255
 WHITE = 255, 255, 255
 
+WASABI_NIGIRI = [{WASABI, nigiri} for nigiri in NIGIRI_SCORES]
+MAKI_ICONS = {Card.Type.SINGLE_MAKI.value - 1: 1, Card.Type.DOUBLE_MAKI.value - 1: 2, Card.Type.TRIPLE_MAKI.value - 1: 3}
+
 class SushiGoBoard(GameState):
 
-    def __init__(self, players):
+    def __init__(self, players, rng=None):
         super().__init__(players)
+        if rng is not None:
+            self.rng = rng
 
         # Basic setup
         self.hands = {player: [] for player in players}
         self.played_cards = {player: [] for player in players}
         self.cards_to_be_played = {player: [] for player in players} # Cards that have been chosen but not revealed
-        self.deck = DeckOfCards()
+        self.deck = DeckOfCards(self.rng)
         self.deck.initialize_deck()
         self.scores = {player: 0 for player in players}
+        self.history = [] # Undo records for the moves made on this board
+        self.round_results = [] # The points each player scored in each finished round
+
+        # Running counters, updated as cards are revealed so scores never need a rescan
+        self.counts = {player: [0] * NUM_TYPES for player in players} # Played cards of each type
+        self.unused_wasabi = {player: 0 for player in players} # Wasabi no nigiri has been put on yet
+        self.maki_icons = {player: 0 for player in players}
+        self.round_points = {player: 0 for player in players} # Points on the table this round, without maki
+        self.maki_bonus = {player: 0 for player in players} # Maki points if the round ended now
+        self.pudding_bonus = {player: 0 for player in players} # Pudding points if the game ended now
+        self.winner = False # The result of getGameEnded, set once when the game ends
         
         self.output = True
 
@@ -37,6 +54,16 @@ class SushiGoBoard(GameState):
         # Just to be safe
         self.cards_to_be_played = {player: [] for player in self.players}
 
+        # Start the counters again, except for puddings
+        for player in self.players:
+            puddings = self.counts[player][PUDDING]
+            self.counts[player] = [0] * NUM_TYPES
+            self.counts[player][PUDDING] = puddings
+        self.unused_wasabi = {player: 0 for player in self.players}
+        self.maki_icons = {player: 0 for player in self.players}
+        self.round_points = {player: 0 for player in self.players}
+        self.maki_bonus = {player: 0 for player in self.players}
+
         # Deal initial hands
         for _ in range(7):
             for player in self.players:
@@ -46,28 +73,75 @@ class SushiGoBoard(GameState):
         self.current_round = round_number
 
     def clone(self):
-        newBoard = SushiGoBoard(self.players)
+        # Skip __init__, which would build a new deck and deal from it, and copy only the live state
+        newBoard = SushiGoBoard.__new__(SushiGoBoard)
+        newBoard.__dict__.update(self.__dict__)
         newBoard.hands = {player: list(cards) for player, cards in self.hands.items()}
         newBoard.played_cards = {player: list(cards) for player, cards in self.played_cards.items()}
         newBoard.deck = self.deck.clone()
         newBoard.cards_to_be_played = {player: list(cards) for player, cards in self.cards_to_be_played.items()}
-        newBoard.current_player = self.current_player
-        newBoard.current_round = self.current_round
+        newBoard.scores = dict(self.scores)
+        newBoard.round_results = list(self.round_results)
+        newBoard.counts = {player: list(counts) for player, counts in self.counts.items()}
+        newBoard.unused_wasabi = dict(self.unused_wasabi)
+        newBoard.maki_icons = dict(self.maki_icons)
+        newBoard.round_points = dict(self.round_points)
+        newBoard.maki_bonus = dict(self.maki_bonus)
+        newBoard.pudding_bonus = dict(self.pudding_bonus)
+        newBoard.history = []
         return newBoard
+
+    def determinize(self, player, rng=None):
+        # Other players' hands, their chosen but unrevealed cards and the deck are hidden
+        rng = rng if rng is not None else self.rng
+        newBoard = self.clone()
+        newBoard.output = False
+        others = [other for other in self.players if other is not player]
+        unknown = list(newBoard.deck.cards)
+        for other in others:
+            unknown.extend(newBoard.hands[other])
+            unknown.extend(newBoard.cards_to_be_played[other])
+        rng.shuffle(unknown)
+        for other in others:
+            hand_size = len(newBoard.hands[other])
+            newBoard.hands[other] = unknown[:hand_size]
+            chosen_size = len(newBoard.cards_to_be_played[other])
+            newBoard.cards_to_be_played[other] = unknown[hand_size:hand_size + chosen_size]
+            del unknown[:hand_size + chosen_size]
+        newBoard.deck.cards = unknown
+        return newBoard
+
+    def moveKey(self, move):
+        # Cards of the same type are interchangeable
+        return move.key()
     
-    def getPossibleMoves(self):       
-        moves = []
-        for card in self.hands[self.current_player]:
-            moves.append(SushiGoMove(self.current_player, card))
-        # Don't forget chopsticks!
-        if any(card.type == Card.Type.CHOPSTICKS for card in self.played_cards[self.current_player]):
-            for i in range(len(self.hands[self.current_player])):
-                for j in range(i + 1, len(self.hands[self.current_player])):
-                    first_card = self.hands[self.current_player][i]
-                    second_card = self.hands[self.current_player][j]
-                    moves.append(SushiGoMove(self.current_player, first_card, second_card))
+    def getPossibleMoves(self):
+        # Cards of the same type are interchangeable, so there is one move per type in the hand
+        player = self.current_player
+        by_type = {}
+        for card in self.hands[player]:
+            by_type.setdefault(card.type, []).append(card)
+        moves = [SushiGoMove(player, cards[0]) for cards in by_type.values()]
+        # Don't forget chopsticks! One move per pair of types
+        if self.counts[player][CHOPSTICKS] > 0:
+            groups = list(by_type.values())
+            for i, cards in enumerate(groups):
+                if len(cards) > 1:
+                    moves.append(SushiGoMove(player, cards[0], cards[1]))
+                for other in groups[i + 1:]:
+                    moves.append(SushiGoMove(player, cards[0], other[0]))
+                    # Wasabi played before a nigiri in the same turn goes under it, so both orders count
+                    if {cards[0].type.value - 1, other[0].type.value - 1} in WASABI_NIGIRI:
+                        moves.append(SushiGoMove(player, other[0], cards[0]))
         return moves
 
+    def moveWeight(self, move):
+        counts = [0] * NUM_TYPES
+        for card in self.hands[move.player]:
+            counts[card.type.value - 1] += 1
+        second = move.second_card.type.value - 1 if move.second_card else None
+        return SushiGoCountBoard.card_moves(counts, move.card.type.value - 1, second)
+
     def checkIsValid(self, move):
         if not isinstance(move, SushiGoMove):
             return False
@@ -76,7 +150,7 @@ class SushiGoBoard(GameState):
         if move.card not in self.hands[self.current_player]:
             return False
         if move.second_card:
-            if not any(card.type == Card.Type.CHOPSTICKS for card in self.played_cards[self.current_player]):
+            if self.counts[self.current_player][CHOPSTICKS] == 0:
                 return False
             if move.second_card not in self.hands[self.current_player]:
                 return False
@@ -86,15 +160,28 @@ class SushiGoBoard(GameState):
 
     def doMove(self, move):
         # Normally, just store cards
-        self.cards_to_be_played[self.current_player].append(move.card)
-        self.hands[self.current_player].remove(move.card)
+        player = self.current_player
+        hand = self.hands[player]
+        card_index = hand.index(move.card)
+        self.cards_to_be_played[player].append(move.card)
+        del hand[card_index]
+        second_card_index = None
         if move.second_card:
-            self.cards_to_be_played[self.current_player].append(move.second_card)
-            self.hands[self.current_player].remove(move.second_card)
+            second_card_index = hand.index(move.second_card)
+            self.cards_to_be_played[player].append(move.second_card)
+            del hand[second_card_index]
         self.current_player = self.next_player()
 
-        # At the end of each hand, reveal cards
+        # Revealing cards touches every player, so remember the whole state
+        snapshot = None
         if all(len(self.cards_to_be_played[player]) > 0 for player in self.players):
+            snapshot = self.take_snapshot()
+        self.history.append((player, move, card_index, second_card_index, snapshot))
+
+        # At the end of each hand, reveal cards
+        if snapshot is not None:
+            maki_changed = False
+            pudding_changed = False
             for player in self.players:
 
                 # Remove chopsticks from played cards if they are being used
@@ -106,6 +193,7 @@ class SushiGoBoard(GameState):
                         if card.type == Card.Type.CHOPSTICKS:
                             self.hands[player].append(card)
                             self.played_cards[player].remove(card)
+                            self.counts[player][CHOPSTICKS] -= 1
                             chopsticks_found = True
                             break
                     if not chopsticks_found:
@@ -113,10 +201,21 @@ class SushiGoBoard(GameState):
                 # Play the cards
                 for card in self.cards_to_be_played[player]:
                     self.played_cards[player].append(card)
+                    index = self.count_card(player, card)
+                    maki_changed = maki_changed or index in MAKI_ICONS
+                    pudding_changed = pudding_changed or index == PUDDING
                     if self.output:
                         print(f"{player.name} plays {card}")
                 self.cards_to_be_played[player] = []
 
+            # Only rank players again when what they are ranked on has changed
+            if maki_changed:
+                bonus = SushiGoCountBoard.place_bonus([self.maki_icons[player] for player in self.players], 6, 3)
+                self.maki_bonus = dict(zip(self.players, bonus))
+            if pudding_changed:
+                bonus = SushiGoCountBoard.pudding_bonus([self.counts[player][PUDDING] for player in self.players])
+                self.pudding_bonus = dict(zip(self.players, bonus))
+
             # Pass hands
             new_hands = {player: [] for player in self.players}
             for i, player in enumerate(self.players):
@@ -131,8 +230,10 @@ class SushiGoBoard(GameState):
             # Check for end of round
             if len(self.hands[self.players[0]]) == 0:
                 #print("End of round!")
+                round_scores = self.round_scores()
+                self.round_results.append(round_scores)
                 for player in self.players:
-                        round_score = self.score_cards(player, self.played_cards[player])
+                        round_score = round_scores[player]
                         self.scores[player] += round_score
                         if self.output:
                             print(f"{player.name} scores {round_score} points this round.  Total score: {self.scores[player]}")
@@ -140,20 +241,83 @@ class SushiGoBoard(GameState):
                 if self.current_round < 3:
                     if self.output:
                         print(f"Starting round {self.current_round + 1}")
+                    snapshot['deck'] = list(self.deck.cards)
                     self.setup_round(self.current_round + 1)
                 else:
                     # Game over
                     if self.output:
                         print("Game ends!")
+                    pudding_scores = self.pudding_scores()
                     for player in self.players:
-                        pudding_score = self.score_pudding(player)
+                        pudding_score = pudding_scores[player]
                         self.scores[player] += pudding_score
                         if self.output:
                             print(f"{player.name} scores {pudding_score} points from puddings.  Total score: {self.scores[player]}")
-                    pass
+                    self.winner = self.find_winner()
 
         return self
-    
+
+    def undoMove(self):
+        player, move, card_index, second_card_index, snapshot = self.history.pop()
+        if snapshot is not None:
+            self.restore_snapshot(snapshot)
+
+        hand = self.hands[player]
+        if move.second_card:
+            self.cards_to_be_played[player].pop()
+            hand.insert(second_card_index, move.second_card)
+        self.cards_to_be_played[player].pop()
+        hand.insert(card_index, move.card)
+        self.current_player = player
+        return self
+
+    def take_snapshot(self):
+        # Everything that revealing cards, scoring and setting up a round can change
+        return {
+            'hands': {player: list(cards) for player, cards in self.hands.items()},
+            'played_cards': {player: list(cards) for player, cards in self.played_cards.items()},
+            'cards_to_be_played': {player: list(cards) for player, cards in self.cards_to_be_played.items()},
+            'scores': dict(self.scores),
+            'round_results': list(self.round_results),
+            'counts': {player: list(counts) for player, counts in self.counts.items()},
+            'unused_wasabi': dict(self.unused_wasabi),
+            'maki_icons': dict(self.maki_icons),
+            'round_points': dict(self.round_points),
+            'maki_bonus': self.maki_bonus,
+            'pudding_bonus': self.pudding_bonus,
+            'current_round': self.current_round
+        }
+
+    def restore_snapshot(self, snapshot):
+        self.hands = snapshot['hands']
+        self.played_cards = snapshot['played_cards']
+        self.cards_to_be_played = snapshot['cards_to_be_played']
+        self.scores = snapshot['scores']
+        self.round_results = snapshot['round_results']
+        self.counts = snapshot['counts']
+        self.unused_wasabi = snapshot['unused_wasabi']
+        self.maki_icons = snapshot['maki_icons']
+        self.round_points = snapshot['round_points']
+        self.maki_bonus = snapshot['maki_bonus']
+        self.pudding_bonus = snapshot['pudding_bonus']
+        self.current_round = snapshot['current_round']
+        self.winner = False
+        if 'deck' in snapshot:
+            self.deck.cards = snapshot['deck']
+
+    def hash_key(self):
+        # Cards of the same type are interchangeable, so hands are keyed by their counts, like SushiGoCountBoard
+        return hash((
+            self.players.index(self.current_player),
+            self.current_round,
+            tuple(tuple(SushiGoCountBoard.counts(self.hands[player])) for player in self.players),
+            tuple(tuple(self.counts[player]) for player in self.players),
+            tuple(tuple(card.type.value for card in self.cards_to_be_played[player]) for player in self.players),
+            tuple(self.unused_wasabi[player] for player in self.players),
+            tuple(self.round_points[player] for player in self.players),
+            tuple(self.scores[player] for player in self.players)
+        ))
+
     def currentPlayer(self):
         return self.current_player
     
@@ -163,15 +327,16 @@ class SushiGoBoard(GameState):
         return self.players[next_index]
         
     def getGameEnded(self):
-        if self.current_round == 3 and len(self.hands[self.players[-1]]) == 0:
-            scores = self.scoreBoard()
-            max_score = max(scores.values())
-            winners = [player for player, score in scores.items() if score == max_score]
-            if len(winners) == 1:
-                return winners[0]
-            else:
-                return TiePlayer(winners)
-        return False
+        # Worked out once by doMove when the last round is scored
+        return self.winner
+
+    def find_winner(self):
+        max_score = max(self.scores.values())
+        winners = [player for player, score in self.scores.items() if score == max_score]
+        if len(winners) == 1:
+            return winners[0]
+        else:
+            return TiePlayer(winners)
             
     def scoreBoard(self):
         # return the score for each player
@@ -180,72 +345,62 @@ class SushiGoBoard(GameState):
             scores[player] = self.scores[player]
         return scores
 
-    def score_cards(self, player, cards):
-        # Implement scoring logic based on Sushi Go rules
-        score = 0
-        # Maki
-        maki_winners, maki_second = self.find_max_maki()
-        if player in maki_winners:
-            score += 6 // len(maki_winners)
-        elif player in maki_second:
-            score += 3 // len(maki_second)
-        tempura_count = sum(1 for card in cards if card.type == Card.Type.TEMPURA)
-        score += (tempura_count // 2) * 5
-        sashimi_count = sum(1 for card in cards if card.type == Card.Type.SASHIMI)
-        score += (sashimi_count // 3) * 10
-        dumpling_count = sum(1 for card in cards if card.type == Card.Type.DUMPLING)
-        dumpling_scores = [0, 1, 3, 6, 10, 15]
-        score += dumpling_scores[min(dumpling_count, 5)]
-        wasabi = []
-        nigiri_scores = {Card.Type.SALMON_NIGIRI: 2, Card.Type.SQUID_NIGIRI: 3, Card.Type.EGG_NIGIRI: 1}
-        for card in cards:
-            if card.type == Card.Type.WASABI:
-                wasabi.append(card)
-            elif card.type in nigiri_scores.keys():
-                if wasabi:
-                    wasabi.pop()
-                    score += nigiri_scores[card.type] * 3
-                else:
-                    score += nigiri_scores[card.type]
-        return score
+    def count_card(self, player, card):
+        """
+        Adds one revealed card to the counters of player
+
+        Returns:
+            index: the card's type index
+        """
+        index = card.type.value - 1
+        counts = self.counts[player]
+        counts[index] += 1
+        if index == TEMPURA:
+            if counts[index] % 2 == 0:
+                self.round_points[player] += 5
+        elif index == SASHIMI:
+            if counts[index] % 3 == 0:
+                self.round_points[player] += 10
+        elif index == DUMPLING:
+            # The nth dumpling adds n points, up to the fifth
+            if counts[index] <= 5:
+                self.round_points[player] += counts[index]
+        elif index in NIGIRI_SCORES:
+            if self.unused_wasabi[player]:
+                self.unused_wasabi[player] -= 1
+                self.round_points[player] += NIGIRI_SCORES[index] * 3
+            else:
+                self.round_points[player] += NIGIRI_SCORES[index]
+        elif index == WASABI:
+            self.unused_wasabi[player] += 1
+        elif index in MAKI_ICONS:
+            self.maki_icons[player] += MAKI_ICONS[index]
+        return index
 
-    def score_pudding(self, player):
-        score = 0
-        pudding_winners, pudding_losers = self.find_pudding()
-        if pudding_winners is not None:
-            if player in pudding_winners:
-                score += 6 // len(pudding_winners)
-            elif player in pudding_losers:
-                score -= 6 // len(pudding_losers)
+    def provisional_score(self, player):
+        """
+        Returns:
+            score: the score of player if the round ended now, in constant time.
+                   Puddings are counted in the last round
+        """
+        if self.winner is not False:
+            return self.scores[player]
+        score = self.scores[player] + self.round_points[player] + self.maki_bonus[player]
+        if self.current_round == 3:
+            score += self.pudding_bonus[player]
         return score
 
-    def find_max_maki(self):
-        maki_counts = {}
-        for player in self.players:
-            for card in self.played_cards[player]:
-                if card.type == Card.Type.SINGLE_MAKI:
-                    maki_counts[player] = maki_counts.get(player, 0) + 1
-                elif card.type == Card.Type.DOUBLE_MAKI:
-                    maki_counts[player] = maki_counts.get(player, 0) + 2
-                elif card.type == Card.Type.TRIPLE_MAKI:
-                    maki_counts[player] = maki_counts.get(player, 0) + 3
-        maki_counts = sorted(maki_counts.items(), key=lambda x: x[1], reverse=True)
-        winners = [player for player, count in maki_counts if count == maki_counts[0][1]]
-        second_place = []
-        if len(maki_counts) > 1:
-            second_place = [player for player, count in maki_counts if count == maki_counts[1][1]]
-        return winners, second_place
-
-    def find_pudding(self):
-        pudding_counts = {}
-        for player in self.players:
-            pudding_counts[player] = sum(1 for card in self.played_cards[player] if card.type == Card.Type.PUDDING)
-        pudding_counts = sorted(pudding_counts.items(), key=lambda x: x[1], reverse=True)
-        if pudding_counts[0][1] == pudding_counts[-1][1]:
-            return None, None
-        winners = [player for player, count in pudding_counts if count == pudding_counts[0][1]]
-        losers = [player for player, count in pudding_counts if count == pudding_counts[-1][1]]
-        return winners, losers
+    def provisional_scores(self):
+        # provisional_score for every player
+        return {player: self.provisional_score(player) for player in self.players}
+
+    def round_scores(self):
+        # The points each player scores for the cards played this round, maki included
+        return {player: self.round_points[player] + self.maki_bonus[player] for player in self.players}
+
+    def pudding_scores(self):
+        # The points each player scores for puddings at the end of the game
+        return dict(self.pudding_bonus)
 
     def initializeDrawing(self):
         pass
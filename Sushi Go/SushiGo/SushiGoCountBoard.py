@@ -0,0 +1,453 @@
+from GameState import GameState
+from SushiGo.DeckOfCards import DeckOfCards
+from SushiGo.Card import Card
+from SushiGo.SushiGoMove import SushiGoMove
+
+from TiePlayer import TiePlayer
+
+# Cards are only told apart by type, so every hand and tableau is a list of 12 counts,
+# one per Card.Type, indexed by the type's value minus one
+TYPES = list(Card.Type)
+NUM_TYPES = len(TYPES)
+CARDS = [Card(card_type) for card_type in TYPES] # One shared card per type, for moves and views
+
+TEMPURA = Card.Type.TEMPURA.value - 1
+SASHIMI = Card.Type.SASHIMI.value - 1
+DUMPLING = Card.Type.DUMPLING.value - 1
+SINGLE_MAKI = Card.Type.SINGLE_MAKI.value - 1
+DOUBLE_MAKI = Card.Type.DOUBLE_MAKI.value - 1
+TRIPLE_MAKI = Card.Type.TRIPLE_MAKI.value - 1
+SALMON_NIGIRI = Card.Type.SALMON_NIGIRI.value - 1
+SQUID_NIGIRI = Card.Type.SQUID_NIGIRI.value - 1
+EGG_NIGIRI = Card.Type.EGG_NIGIRI.value - 1
+PUDDING = Card.Type.PUDDING.value - 1
+WASABI = Card.Type.WASABI.value - 1
+CHOPSTICKS = Card.Type.CHOPSTICKS.value - 1
+
+NIGIRI_SCORES = {SALMON_NIGIRI: 2, SQUID_NIGIRI: 3, EGG_NIGIRI: 1}
+DUMPLING_SCORES = [0, 1, 3, 6, 10, 15]
+HAND_SIZE = 7
+
+
+def type_index(card):
+    """
+    Returns:
+        index: the count slot of a Card or a Card.Type
+    """
+    card_type = card.type if isinstance(card, Card) else card
+    return card_type.value - 1
+
+
+class SushiGoCountBoard(GameState):
+    """
+    Sushi Go with every hand and tableau stored as 12 card-type counts instead of lists of cards.
+    Clones, moves and hashing cost the same however many cards are in play.
+    The order of wasabi and nigiri is kept by scoring nigiri as they are revealed.
+
+    hands, played_cards and cards_to_be_played give the same maps of players to card lists as
+    SushiGoBoard, so SushiGoCPUPlayerAdapter and the human player work unchanged. A move may name
+    any card of a type; the board only looks at its type
+    """
+
+    def __init__(self, players, rng=None):
+        super().__init__(players)
+        if rng is not None:
+            self.rng = rng
+
+        self.seats = {player: seat for seat, player in enumerate(players)}
+        self.hand_counts = [[0] * NUM_TYPES for _ in players]
+        self.played_counts = [[0] * NUM_TYPES for _ in players]
+        self.chosen = [[] for _ in players] # Type indices chosen but not revealed, in the order they were picked
+        self.wasabi = [0] * len(players) # Wasabi on the table that no nigiri has been put on yet
+        self.nigiri_points = [0] * len(players) # Points from nigiri this round, wasabi included
+        self.scores = [0] * len(players)
+        self.history = [] # Undo records for the moves made on this board
+
+        # The deck is a list of type indices, dealt from the end
+        self.deck = [type_index(card) for card in DeckOfCards(self.rng).cards]
+        self.output = True
+
+        self.setup_round(1)
+
+    @staticmethod
+    def from_board(board):
+        """
+        Input:
+            board: a SushiGoBoard
+
+        Returns:
+            board: a SushiGoCountBoard in the same position, with the same deck order
+        """
+        newBoard = SushiGoCountBoard.__new__(SushiGoCountBoard)
+        GameState.__init__(newBoard, board.players)
+        if 'rng' in vars(board):
+            newBoard.rng = board.rng
+        newBoard.seats = {player: seat for seat, player in enumerate(board.players)}
+        newBoard.hand_counts = [SushiGoCountBoard.counts(board.hands[player]) for player in board.players]
+        newBoard.played_counts = [SushiGoCountBoard.counts(board.played_cards[player]) for player in board.players]
+        newBoard.chosen = [[type_index(card) for card in board.cards_to_be_played[player]] for player in board.players]
+        newBoard.wasabi = [0] * len(board.players)
+        newBoard.nigiri_points = [0] * len(board.players)
+        for seat, player in enumerate(board.players):
+            for card in board.played_cards[player]:
+                newBoard.play_wasabi_and_nigiri(seat, type_index(card))
+        newBoard.scores = [board.scores[player] for player in board.players]
+        newBoard.deck = [type_index(card) for card in board.deck.cards]
+        newBoard.history = []
+        newBoard.output = board.output
+        newBoard.current_seat = board.players.index(board.current_player)
+        newBoard.current_round = board.current_round
+        return newBoard
+
+    @staticmethod
+    def counts(cards):
+        counts = [0] * NUM_TYPES
+        for card in cards:
+            counts[type_index(card)] += 1
+        return counts
+
+    def setup_round(self, round_number):
+        # Clear played cards except pudding
+        for seat, counts in enumerate(self.played_counts):
+            puddings = counts[PUDDING]
+            self.played_counts[seat] = [0] * NUM_TYPES
+            self.played_counts[seat][PUDDING] = puddings
+        self.chosen = [[] for _ in self.players]
+        self.wasabi = [0] * len(self.players)
+        self.nigiri_points = [0] * len(self.players)
+
+        # Deal initial hands
+        for _ in range(HAND_SIZE):
+            for seat in range(len(self.players)):
+                self.hand_counts[seat][self.deck.pop()] += 1
+
+        self.current_seat = 0
+        self.current_round = round_number
+
+    def clone(self):
+        newBoard = SushiGoCountBoard.__new__(SushiGoCountBoard)
+        newBoard.__dict__.update(self.__dict__)
+        newBoard.hand_counts = [list(counts) for counts in self.hand_counts]
+        newBoard.played_counts = [list(counts) for counts in self.played_counts]
+        newBoard.chosen = [list(chosen) for chosen in self.chosen]
+        newBoard.wasabi = list(self.wasabi)
+        newBoard.nigiri_points = list(self.nigiri_points)
+        newBoard.scores = list(self.scores)
+        newBoard.deck = list(self.deck)
+        newBoard.history = []
+        return newBoard
+
+    def determinize(self, player, rng=None):
+        # Other players' hands, their chosen but unrevealed cards and the deck are hidden
+        rng = rng if rng is not None else self.rng
+        newBoard = self.clone()
+        newBoard.output = False
+        seat = self.seats[player]
+        others = [other for other in range(len(self.players)) if other != seat]
+        unknown = list(newBoard.deck)
+        for other in others:
+            for index, count in enumerate(newBoard.hand_counts[other]):
+                unknown.extend([index] * count)
+            unknown.extend(newBoard.chosen[other])
+        rng.shuffle(unknown)
+        for other in others:
+            hand_size = sum(newBoard.hand_counts[other])
+            counts = [0] * NUM_TYPES
+            for index in unknown[:hand_size]:
+                counts[index] += 1
+            newBoard.hand_counts[other] = counts
+            chosen_size = len(newBoard.chosen[other])
+            newBoard.chosen[other] = unknown[hand_size:hand_size + chosen_size]
+            del unknown[:hand_size + chosen_size]
+        newBoard.deck = unknown
+        return newBoard
+
+    def moveKey(self, move):
+        return move.key()
+
+    # Views with the same shape as SushiGoBoard's, built from the counts
+
+    @property
+    def current_player(self):
+        return self.players[self.current_seat]
+
+    @property
+    def hands(self):
+        return {player: self.cards(self.hand_counts[seat]) for seat, player in enumerate(self.players)}
+
+    @property
+    def played_cards(self):
+        return {player: self.cards(self.played_counts[seat]) for seat, player in enumerate(self.players)}
+
+    @property
+    def cards_to_be_played(self):
+        return {player: [CARDS[index] for index in self.chosen[seat]] for seat, player in enumerate(self.players)}
+
+    @staticmethod
+    def cards(counts):
+        cards = []
+        for index, count in enumerate(counts):
+            cards.extend([CARDS[index]] * count)
+        return cards
+
+    def getPossibleMoves(self):
+        player = self.current_player
+        hand = self.hand_counts[self.current_seat]
+        held = [index for index in range(NUM_TYPES) if hand[index] > 0]
+        moves = [SushiGoMove(player, CARDS[index]) for index in held]
+        # Chopsticks play any two cards, which only differ by their pair of types
+        if self.played_counts[self.current_seat][CHOPSTICKS] > 0:
+            for i, first in enumerate(held):
+                if hand[first] > 1:
+                    moves.append(SushiGoMove(player, CARDS[first], CARDS[first]))
+                for second in held[i + 1:]:
+                    moves.append(SushiGoMove(player, CARDS[first], CARDS[second]))
+                    # Wasabi played before a nigiri in the same turn goes under it
+                    if second == WASABI and first in NIGIRI_SCORES:
+                        moves.append(SushiGoMove(player, CARDS[WASABI], CARDS[first]))
+        return moves
+
+    def moveWeight(self, move):
+        second = type_index(move.second_card) if move.second_card else None
+        return SushiGoCountBoard.card_moves(self.hand_counts[self.current_seat], type_index(move.card), second)
+
+    @staticmethod
+    def card_moves(hand, first, second=None):
+        """
+        Input:
+            hand: the counts of the hand
+            first, second: the type indices of a move, second None for a single card
+
+        Returns:
+            moves: how many moves on single cards of the hand the move stands for. Wasabi and
+                   a nigiri are offered in both orders, so each order gets half of their pairs
+        """
+        if second is None:
+            return hand[first]
+        if first == second:
+            return hand[first] * (hand[first] - 1) / 2
+        pairs = hand[first] * hand[second]
+        if WASABI in (first, second) and (first in NIGIRI_SCORES or second in NIGIRI_SCORES):
+            return pairs / 2
+        return pairs
+
+    def checkIsValid(self, move):
+        if not isinstance(move, SushiGoMove):
+            return False
+        if move.player != self.current_player:
+            return False
+        hand = self.hand_counts[self.current_seat]
+        first = type_index(move.card)
+        if hand[first] == 0:
+            return False
+        if move.second_card:
+            if self.played_counts[self.current_seat][CHOPSTICKS] == 0:
+                return False
+            second = type_index(move.second_card)
+            if hand[second] < (2 if second == first else 1):
+                return False
+        return True
+
+    def doMove(self, move):
+        # Normally, just store cards
+        seat = self.current_seat
+        hand = self.hand_counts[seat]
+        first = type_index(move.card)
+        hand[first] -= 1
+        self.chosen[seat].append(first)
+        if move.second_card:
+            second = type_index(move.second_card)
+            hand[second] -= 1
+            self.chosen[seat].append(second)
+        self.current_seat = (seat + 1) % len(self.players)
+
+        # Revealing cards touches every player, so remember the whole state
+        snapshot = None
+        if all(self.chosen):
+            snapshot = self.take_snapshot()
+        self.history.append((seat, move, snapshot))
+
+        # At the end of each hand, reveal cards
+        if snapshot is not None:
+            self.reveal()
+        return self
+
+    def reveal(self):
+        for seat, player in enumerate(self.players):
+            played = self.played_counts[seat]
+
+            # Put used chopsticks back in the hand
+            if len(self.chosen[seat]) == 2:
+                if self.output:
+                    print(f"{player.name} is using chopsticks.")
+                if played[CHOPSTICKS] == 0:
+                    raise ValueError("Chopsticks not found in played cards when expected.")
+                played[CHOPSTICKS] -= 1
+                self.hand_counts[seat][CHOPSTICKS] += 1
+
+            # Play the cards
+            for index in self.chosen[seat]:
+                played[index] += 1
+                self.play_wasabi_and_nigiri(seat, index)
+                if self.output:
+                    print(f"{player.name} plays {CARDS[index]}")
+            self.chosen[seat] = []
+
+        # Pass hands
+        if self.current_round == 1 or self.current_round == 3:
+            self.hand_counts = self.hand_counts[1:] + self.hand_counts[:1]
+        else:
+            self.hand_counts = self.hand_counts[-1:] + self.hand_counts[:-1]
+
+        # Check for end of round
+        if sum(self.hand_counts[0]) == 0:
+            round_scores = self.round_scores()
+            for seat, player in enumerate(self.players):
+                self.scores[seat] += round_scores[seat]
+                if self.output:
+                    print(f"{player.name} scores {round_scores[seat]} points this round.  Total score: {self.scores[seat]}")
+
+            if self.current_round < 3:
+                if self.output:
+                    print(f"Starting round {self.current_round + 1}")
+                self.setup_round(self.current_round + 1)
+            else:
+                if self.output:
+                    print("Game ends!")
+                pudding_scores = self.pudding_scores()
+                for seat, player in enumerate(self.players):
+                    self.scores[seat] += pudding_scores[seat]
+                    if self.output:
+                        print(f"{player.name} scores {pudding_scores[seat]} points from puddings.  Total score: {self.scores[seat]}")
+
+    def play_wasabi_and_nigiri(self, seat, index):
+        # A nigiri goes on an unused wasabi if there is one, and scores as it is played
+        if index == WASABI:
+            self.wasabi[seat] += 1
+        elif index in NIGIRI_SCORES:
+            if self.wasabi[seat]:
+                self.wasabi[seat] -= 1
+                self.nigiri_points[seat] += NIGIRI_SCORES[index] * 3
+            else:
+                self.nigiri_points[seat] += NIGIRI_SCORES[index]
+
+    def undoMove(self):
+        seat, move, snapshot = self.history.pop()
+        if snapshot is not None:
+            self.restore_snapshot(snapshot)
+
+        hand = self.hand_counts[seat]
+        if move.second_card:
+            hand[self.chosen[seat].pop()] += 1
+        hand[self.chosen[seat].pop()] += 1
+        self.current_seat = seat
+        return self
+
+    def take_snapshot(self):
+        # Everything that revealing cards, scoring and setting up a round can change
+        return (
+            [list(counts) for counts in self.hand_counts],
+            [list(counts) for counts in self.played_counts],
+            [list(chosen) for chosen in self.chosen],
+            list(self.wasabi),
+            list(self.nigiri_points),
+            list(self.scores),
+            len(self.deck),
+            self.deck[-len(self.players) * HAND_SIZE:],
+            self.current_round
+        )
+
+    def restore_snapshot(self, snapshot):
+        (self.hand_counts, self.played_counts, self.chosen, self.wasabi, self.nigiri_points,
+         self.scores, deck_size, dealt, self.current_round) = snapshot
+        # Put back any cards dealt for a new round
+        if len(self.deck) < deck_size:
+            self.deck.extend(dealt)
+
+    def hash_key(self):
+        return hash((
+            self.current_seat,
+            self.current_round,
+            tuple(map(tuple, self.hand_counts)),
+            tuple(map(tuple, self.played_counts)),
+            tuple(map(tuple, self.chosen)),
+            tuple(self.wasabi),
+            tuple(self.nigiri_points),
+            tuple(self.scores)
+        ))
+
+    def currentPlayer(self):
+        return self.current_player
+
+    def getGameEnded(self):
+        if self.current_round == 3 and sum(self.hand_counts[-1]) == 0:
+            max_score = max(self.scores)
+            winners = [player for seat, player in enumerate(self.players) if self.scores[seat] == max_score]
+            if len(winners) == 1:
+                return winners[0]
+            else:
+                return TiePlayer(winners)
+        return False
+
+    def scoreBoard(self):
+        # return the score for each player
+        return {player: self.scores[seat] for seat, player in enumerate(self.players)}
+
+    def round_scores(self):
+        """
+        Returns:
+            scores: the points every seat scores for the cards on the table this round
+        """
+        makis = [counts[SINGLE_MAKI] + 2 * counts[DOUBLE_MAKI] + 3 * counts[TRIPLE_MAKI] for counts in self.played_counts]
+        maki_bonus = self.place_bonus(makis, 6, 3)
+
+        scores = []
+        for seat, counts in enumerate(self.played_counts):
+            score = maki_bonus[seat]
+            score += (counts[TEMPURA] // 2) * 5
+            score += (counts[SASHIMI] // 3) * 10
+            score += DUMPLING_SCORES[min(counts[DUMPLING], 5)]
+            score += self.nigiri_points[seat]
+            scores.append(score)
+        return scores
+
+    def pudding_scores(self):
+        """
+        Returns:
+            scores: the points every seat scores for puddings at the end of the game
+        """
+        return self.pudding_bonus([counts[PUDDING] for counts in self.played_counts])
+
+    @staticmethod
+    def pudding_bonus(puddings):
+        # Nobody scores when everyone has the same number of puddings
+        most = max(puddings)
+        fewest = min(puddings)
+        if most == fewest:
+            return [0] * len(puddings)
+        winners = puddings.count(most)
+        losers = puddings.count(fewest)
+        return [6 // winners if count == most else -(6 // losers) if count == fewest else 0 for count in puddings]
+
+    @staticmethod
+    def place_bonus(makis, first, second):
+        # Scored like SushiGoScoring.place_bonus: only players with maki place,
+        # and a tie for first takes the second place with it
+        held = sorted((count for count in makis if count > 0), reverse=True)
+        bonus = [0] * len(makis)
+        if not held:
+            return bonus
+        winners = [seat for seat, count in enumerate(makis) if count == held[0]]
+        for seat in winners:
+            bonus[seat] = first // len(winners)
+        if len(held) > 1 and held[1] < held[0]:
+            seconds = [seat for seat, count in enumerate(makis) if count == held[1]]
+            for seat in seconds:
+                bonus[seat] = second // len(seconds)
+        return bonus
+
+    def initializeDrawing(self):
+        pass
+
+    def drawBoard(self):
+        pass
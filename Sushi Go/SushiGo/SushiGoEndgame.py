@@ -0,0 +1,234 @@
+from SushiGo.SushiGoCountBoard import (SushiGoCountBoard, NUM_TYPES, HAND_SIZE, TEMPURA, SASHIMI, DUMPLING,
+                                      SINGLE_MAKI, DOUBLE_MAKI, TRIPLE_MAKI, PUDDING, WASABI, CHOPSTICKS,
+                                      NIGIRI_SCORES, type_index)
+from SushiGo.SushiGoMove import SushiGoMove
+
+# What each player has on the table, as far as the rest of the round can change its score:
+# (tempura mod 2, sashimi mod 3, dumplings up to 5, maki icons, puddings, chopsticks, unused wasabi)
+T_TEMPURA, T_SASHIMI, T_DUMPLING, T_MAKI, T_PUDDING, T_CHOPSTICKS, T_WASABI = range(7)
+MAKI_ICONS = {SINGLE_MAKI: 1, DOUBLE_MAKI: 2, TRIPLE_MAKI: 3}
+NO_CARD = -1
+
+
+class SushiGoEndgameSolver():
+    """
+    Solves the last tricks of a Sushi Go round once every hand is known, which is the case
+    after the hands have gone once around the table. Each trick is a simultaneous-move game;
+    the solver looks for a pure equilibrium of it by best-response dynamics, with the value of
+    every joint pick worked out the same way for the tricks after it. The last trick is forced,
+    so its value is exact.
+
+    States are canonical count tuples: the hands, what each table can still score from, and
+    each player's points so far, so positions reached by different picks are solved once.
+    Values are every player's total score at the end of the round, and players pick to
+    maximize their margin over the best other player
+    """
+
+    def __init__(self, maxEntries=1000000, maxIterations=10):
+        """
+        Input:
+            maxEntries: the most states to remember; the memo starts again when it is full
+            maxIterations: the most rounds of best responses per trick. If the picks still
+                           change after that, the last ones are used
+        """
+        self.maxEntries = maxEntries
+        self.maxIterations = maxIterations
+        self.memo = {}
+
+    @staticmethod
+    def tricks_left(board):
+        """
+        Returns:
+            tricks: the tricks left in the round, counting the one being played
+        """
+        board = board if isinstance(board, SushiGoCountBoard) else SushiGoCountBoard.from_board(board)
+        seat = board.current_seat
+        return sum(board.hand_counts[seat]) + len(board.chosen[seat])
+
+    @staticmethod
+    def can_solve(board, maxTricks):
+        """
+        Returns:
+            True if every hand is known to the player to move and at most maxTricks are left
+        """
+        tricks = SushiGoEndgameSolver.tricks_left(board)
+        return tricks <= maxTricks and HAND_SIZE - tricks >= len(board.players) - 1
+
+    def state(self, board):
+        """
+        Input:
+            board: a SushiGoBoard or SushiGoCountBoard. Cards chosen but not revealed in this
+                   trick go back into their hands, since the player to move can't see them
+
+        Returns:
+            state: the canonical state at the start of the trick
+        """
+        board = board if isinstance(board, SushiGoCountBoard) else SushiGoCountBoard.from_board(board)
+        hands = []
+        tables = []
+        points = []
+        for seat, played in enumerate(board.played_counts):
+            hand = list(board.hand_counts[seat])
+            for index in board.chosen[seat]:
+                hand[index] += 1
+            hands.append(tuple(hand))
+            tables.append((
+                played[TEMPURA] % 2,
+                played[SASHIMI] % 3,
+                min(played[DUMPLING], 5),
+                played[SINGLE_MAKI] + 2 * played[DOUBLE_MAKI] + 3 * played[TRIPLE_MAKI],
+                played[PUDDING] if board.current_round == 3 else 0,
+                played[CHOPSTICKS],
+                board.wasabi[seat]
+            ))
+            points.append(board.scores[seat] + (played[TEMPURA] // 2) * 5 + (played[SASHIMI] // 3) * 10
+                          + sum(range(min(played[DUMPLING], 5) + 1)) + board.nigiri_points[seat])
+        return (tuple(hands), tuple(tables), tuple(points), board.current_round)
+
+    @staticmethod
+    def actions(hand, table):
+        """
+        Returns:
+            actions: the picks open to a player, as (first, second) type indices with
+                     second NO_CARD for a single card, one per distinct move like SushiGoCountBoard
+        """
+        held = [index for index in range(NUM_TYPES) if hand[index] > 0]
+        actions = [(index, NO_CARD) for index in held]
+        if table[T_CHOPSTICKS] > 0:
+            for i, first in enumerate(held):
+                if hand[first] > 1:
+                    actions.append((first, first))
+                for second in held[i + 1:]:
+                    actions.append((first, second))
+                    if second == WASABI and first in NIGIRI_SCORES:
+                        actions.append((WASABI, first))
+        return actions
+
+    @staticmethod
+    def play(hand, table, points, action):
+        """
+        Returns:
+            hand, table, points: one player's state after revealing action
+        """
+        hand = list(hand)
+        table = list(table)
+        first, second = action
+        hand[first] -= 1
+        cards = [first]
+        if second != NO_CARD:
+            hand[second] -= 1
+            cards.append(second)
+            table[T_CHOPSTICKS] -= 1
+            hand[CHOPSTICKS] += 1
+        for index in cards:
+            if index == TEMPURA:
+                table[T_TEMPURA] = (table[T_TEMPURA] + 1) % 2
+                points += 5 if table[T_TEMPURA] == 0 else 0
+            elif index == SASHIMI:
+                table[T_SASHIMI] = (table[T_SASHIMI] + 1) % 3
+                points += 10 if table[T_SASHIMI] == 0 else 0
+            elif index == DUMPLING:
+                if table[T_DUMPLING] < 5:
+                    table[T_DUMPLING] += 1
+                    points += table[T_DUMPLING]
+            elif index in MAKI_ICONS:
+                table[T_MAKI] += MAKI_ICONS[index]
+            elif index in NIGIRI_SCORES:
+                if table[T_WASABI]:
+                    table[T_WASABI] -= 1
+                    points += NIGIRI_SCORES[index] * 3
+                else:
+                    points += NIGIRI_SCORES[index]
+            elif index == WASABI:
+                table[T_WASABI] += 1
+            elif index == CHOPSTICKS:
+                table[T_CHOPSTICKS] += 1
+            elif index == PUDDING:
+                table[T_PUDDING] += 1
+        return tuple(hand), tuple(table), points
+
+    def child(self, state, profile):
+        """
+        Returns:
+            state: the state after every player reveals their pick in profile and the hands are passed
+        """
+        hands, tables, points, round_number = state
+        revealed = [self.play(hands[seat], tables[seat], points[seat], action) for seat, action in enumerate(profile)]
+        newHands = [hand for hand, _, _ in revealed]
+        if round_number == 2:
+            newHands = newHands[-1:] + newHands[:-1]
+        else:
+            newHands = newHands[1:] + newHands[:1]
+        return (tuple(newHands), tuple(table for _, table, _ in revealed),
+                tuple(points for _, _, points in revealed), round_number)
+
+    @staticmethod
+    def final_scores(state):
+        """
+        Returns:
+            scores: every player's total at the end of the round, with maki, and puddings in round 3
+        """
+        _, tables, points, round_number = state
+        scores = list(points)
+        bonus = SushiGoCountBoard.place_bonus([table[T_MAKI] for table in tables], 6, 3)
+        if round_number == 3:
+            puddings = SushiGoCountBoard.pudding_bonus([table[T_PUDDING] for table in tables])
+            bonus = [maki + pudding for maki, pudding in zip(bonus, puddings)]
+        return tuple(score + extra for score, extra in zip(scores, bonus))
+
+    @staticmethod
+    def margin(scores, seat):
+        return scores[seat] - max(score for other, score in enumerate(scores) if other != seat)
+
+    def value(self, state):
+        """
+        Returns:
+            scores: every player's total at the end of the round when everyone plays the equilibrium
+            profile: the equilibrium picks for this trick, or None at the end of the round
+        """
+        if state in self.memo:
+            return self.memo[state]
+        hands, tables, _, _ = state
+        if not any(hands[0]):
+            result = (self.final_scores(state), None)
+        else:
+            actions = [self.actions(hand, table) for hand, table in zip(hands, tables)]
+            profile = [options[0] for options in actions]
+            scores = self.value(self.child(state, profile))[0]
+            for _ in range(self.maxIterations):
+                changed = False
+                for seat, options in enumerate(actions):
+                    for action in options:
+                        if action == profile[seat]:
+                            continue
+                        trial = profile[:seat] + [action] + profile[seat + 1:]
+                        trialScores = self.value(self.child(state, trial))[0]
+                        if self.margin(trialScores, seat) > self.margin(scores, seat):
+                            profile, scores = trial, trialScores
+                            changed = True
+                if not changed:
+                    break
+            result = (scores, tuple(profile))
+
+        if len(self.memo) >= self.maxEntries:
+            self.memo = {}
+        self.memo[state] = result
+        return result
+
+    def getMove(self, board, player):
+        """
+        Input:
+            board: a SushiGoBoard or SushiGoCountBoard where can_solve is True
+            player: the player to move
+
+        Returns:
+            move: player's equilibrium pick, as a move on board
+        """
+        seat = board.players.index(player)
+        first, second = self.value(self.state(board))[1][seat]
+        hand = board.hands[player]
+        card = next(card for card in hand if type_index(card) == first)
+        if second == NO_CARD:
+            return SushiGoMove(player, card)
+        secondCard = next(other for other in hand if other is not card and type_index(other) == second)
+        return SushiGoMove(player, card, secondCard)
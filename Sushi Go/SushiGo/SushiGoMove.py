@@ -1,4 +1,9 @@
 from Move import Move
+from SushiGo.Card import Card
+
+NUM_TYPES = len(Card.Type)
+WASABI = Card.Type.WASABI.value - 1
+NIGIRI = (Card.Type.SALMON_NIGIRI.value - 1, Card.Type.SQUID_NIGIRI.value - 1, Card.Type.EGG_NIGIRI.value - 1)
 
 class SushiGoMove(Move):
     
@@ -15,4 +20,18 @@ class SushiGoMove(Move):
     def __eq__(self, other):
         return (isinstance(other, SushiGoMove) and (self.player == other.player) and (self.card == other.card) and (self.second_card == other.second_card))
 
+    def key(self):
+        """
+        Returns:
+            key: a small int for the card types this move plays. Moves that only differ by which
+                 card of a type they pick, or by the order of a pair, share a key, except wasabi
+                 played before a nigiri, which puts the nigiri on it
+        """
+        first = self.card.type.value - 1
+        if not self.second_card:
+            return first
+        second = self.second_card.type.value - 1
+        if second < first and not (first == WASABI and second in NIGIRI):
+            first, second = second, first
+        return NUM_TYPES + first * NUM_TYPES + second
 
@@ -0,0 +1,146 @@
+import glob
+import os
+
+import numpy as np
+
+# Sushi Go games as fixed-width binary records, appended to shard files and read back
+# with np.memmap, so millions of games can be mined without playing them again.
+# A shard is nothing but records back to back, with no header, in the RECORD layout below
+
+MAX_PLAYERS = 5
+ROUNDS = 3
+TRICKS = 21 # Seven picks a round; used chopsticks go back into the hand
+NO_CARD = -1
+
+RECORD = np.dtype([
+    ('seed', 'S24'), # The root seed of a seeded run, as text; empty for unseeded games
+    ('index', '<i4'), # The game's index under the seed, for GameEngine.replay
+    ('num_players', 'i1'),
+    ('seats', 'S24', (MAX_PLAYERS,)), # Player names in seat order
+    ('picks', 'i1', (TRICKS, MAX_PLAYERS, 2)), # Card types picked each trick by each seat, NO_CARD for none
+    ('round_scores', '<i2', (ROUNDS, MAX_PLAYERS)), # Points scored in each round, maki included
+    ('pudding_scores', '<i2', (MAX_PLAYERS,)),
+    ('scores', '<i2', (MAX_PLAYERS,)) # Final scores
+])
+
+
+def game_record(board, seed=None, index=0):
+    """
+    Input:
+        board: a finished SushiGoBoard, with the history of the moves that were made on it
+        seed: the root seed the game was played with, if any
+        index: the game's index under the seed
+
+    Returns:
+        record: a RECORD array of one game
+    """
+    record = np.zeros(1, dtype=RECORD)
+    record['seed'] = b"" if seed is None else str(seed).encode()
+    record['index'] = index
+    record['num_players'] = len(board.players)
+    record['seats'][0, :len(board.players)] = [player.name.encode()[:24] for player in board.players]
+
+    picks = record['picks'][0]
+    picks[:] = NO_CARD
+    seats = {player: seat for seat, player in enumerate(board.players)}
+    tricks = [0] * len(board.players)
+    for player, move, *_ in board.history:
+        seat = seats[player]
+        picks[tricks[seat], seat, 0] = move.card.type.value - 1
+        if move.second_card:
+            picks[tricks[seat], seat, 1] = move.second_card.type.value - 1
+        tricks[seat] += 1
+
+    for number, round_scores in enumerate(board.round_results):
+        record['round_scores'][0, number, :len(board.players)] = [round_scores[player] for player in board.players]
+    record['pudding_scores'][0, :len(board.players)] = [board.pudding_bonus[player] for player in board.players]
+    record['scores'][0, :len(board.players)] = [board.scores[player] for player in board.players]
+    return record
+
+
+class GameRecorder():
+    """
+    Appends finished games to a shard file. Pass record_game as the callback of
+    GameEngine.run_batch to record every game of a batch
+    """
+
+    def __init__(self, path, seed=None, bufferSize=4096):
+        """
+        Input:
+            path: the shard file, created if needed. Records are only ever appended to it,
+                  after a record left unfinished by a crash is cut off
+            seed: the root seed of the games that will be recorded, if they are seeded
+            bufferSize: the number of records to keep in memory before writing them out
+        """
+        self.path = path
+        self.seed = seed
+        self.bufferSize = bufferSize
+        self.buffer = []
+        repair_shard(path)
+        self.file = open(path, 'ab')
+
+    def record_game(self, index, board, winner=None):
+        """
+        Records one finished game, in the form of a run_batch callback
+        """
+        self.buffer.append(game_record(board, self.seed, index))
+        if len(self.buffer) >= self.bufferSize:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes out the buffered records
+        """
+        if self.buffer:
+            self.file.write(np.concatenate(self.buffer).tobytes())
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+
+def repair_shard(path):
+    """
+    Cuts off a record left unfinished by a crash, so records appended after it line up
+    """
+    if not os.path.exists(path):
+        return
+    size = os.path.getsize(path)
+    if size % RECORD.itemsize:
+        with open(path, 'rb+') as f:
+            f.truncate(size - size % RECORD.itemsize)
+
+
+def read_shard(path):
+    """
+    Input:
+        path: a shard file
+
+    Returns:
+        records: the shard's games as a read-only memory-mapped RECORD array. A record cut
+                 short by a crash at the end of the file is left out
+    """
+    count = os.path.getsize(path) // RECORD.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode='r', shape=(count,))
+
+
+def read_shards(pattern):
+    """
+    Input:
+        pattern: a glob pattern of shard files, like "games/*.bin"
+
+    Returns:
+        shards: a list of memory-mapped RECORD arrays, one per file, in file name order.
+                np.concatenate them to copy everything into one array
+    """
+    return [read_shard(path) for path in sorted(glob.glob(pattern))]
@@ -0,0 +1,174 @@
+import math
+import multiprocessing as mp
+import random
+import time
+
+from Player import Player
+from WorkerPool import WorkerPool
+from SushiGo.SushiGoCountBoard import SushiGoCountBoard
+from SushiGo.SushiGoEndgame import SushiGoEndgameSolver
+
+
+def random_policy(board, rng):
+    """
+    The default playout policy: any legal move, uniformly
+    """
+    return rng.choice(board.getPossibleMoves())
+
+
+class PriorityPolicy():
+    """
+    A playout policy that plays like SushiGoYOURNAMEPlayer: the single card whose type
+    has the lowest priority
+    """
+
+    def __init__(self, priorities):
+        self.priorities = priorities
+
+    def __call__(self, board, rng):
+        singles = [move for move in board.getPossibleMoves() if not move.second_card]
+        return min(singles, key=lambda move: self.priorities[move.card.type])
+
+
+def run_rollouts(task):
+    """
+    Plays out every candidate move from the same determinizations, in a worker or in this process
+
+    Input:
+        task: a tuple of (board, seat, playouts, seconds, policy, seed, valueModel). The board is the
+              position to move from, seat is the seat of the player to move, playouts is the most
+              determinizations to play and seconds the most time to spend, either of which can be None.
+              With a valueModel, playouts stop at the end of the round and the model scores the margin
+
+    Returns:
+        totals: a map of move keys to a pair of the summed final score margins and the playouts
+    """
+    board, seat, playouts, seconds, policy, seed, valueModel = task
+    rng = random.Random(seed)
+    player = board.players[seat]
+    deadline = None if seconds is None else time.perf_counter() + seconds
+    keys = [board.moveKey(move) for move in board.getPossibleMoves()]
+    totals = {key: [0, 0] for key in keys}
+
+    played = 0
+    while playouts is None or played < playouts:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        # Play every move from the same deal of the hidden cards, on the faster count board
+        start = SushiGoCountBoard.from_board(board.determinize(player, rng))
+        start.output = False
+        moves = {start.moveKey(move): move for move in start.getPossibleMoves()}
+        for key in keys:
+            state = start.clone()
+            state.doMove(moves[key])
+            while not state.getGameEnded():
+                if valueModel is not None and state.current_round != start.current_round:
+                    break
+                state.doMove(policy(state, rng))
+            if state.getGameEnded():
+                scores = state.scoreBoard()
+                totals[key][0] += scores[player] - max(score for other, score in scores.items() if other is not player)
+            else:
+                totals[key][0] += valueModel.evaluate(state, player)
+            totals[key][1] += 1
+        played += 1
+    return totals
+
+
+class SushiGoRolloutPlayer(Player):
+    """
+    A Monte Carlo Sushi Go player. For every legal move it samples the hidden cards, plays
+    the rest of the game out with a fast default policy, and picks the move with the best mean
+    margin over the best other player. It gets stronger with more playouts, more time or more workers.
+    Once every hand is known and only a few tricks are left, it solves the rest of the round instead
+    """
+
+    def __init__(self, name, playouts=100, timeBudget=None, policy=None, numWorkers=1, endgameTricks=3,
+                 valueModel=None, rng=None):
+        """
+        Input:
+            playouts: the most determinizations to play out per move, or None for no limit.
+                      Each one plays out every legal move. With workers, it is split between them
+            timeBudget: optional number of seconds to spend on each move
+            policy: a function of (board, rng) that returns the move to play in playouts.
+                    random_policy by default; PriorityPolicy plays like a priority-list bot.
+                    With workers it must be a module-level function or a PriorityPolicy
+            numWorkers: the number of worker processes to play out on. The pool starts on the
+                        first move and is kept until close(); inside a worker process, such as a
+                        Tournament's, playouts run in that process instead
+            endgameTricks: the most tricks left in a round for SushiGoEndgameSolver to pick the
+                           move, or None to always play out
+            valueModel: optional SushiGoValueModel. Playouts then stop at the end of the round
+                        and the model predicts the rest, so many more of them fit in the time
+        """
+        super().__init__(name)
+        if playouts is None and timeBudget is None:
+            raise ValueError("A rollout player needs a number of playouts, a time budget or both")
+        self.playouts = playouts
+        self.timeBudget = timeBudget
+        self.policy = policy if policy is not None else random_policy
+        self.numWorkers = numWorkers
+        self.endgameTricks = endgameTricks
+        self.endgameSolver = SushiGoEndgameSolver() # Kept between moves, so its memo carries over
+        self.valueModel = valueModel
+        self.pool = None
+        if rng is not None:
+            self.rng = rng
+
+    def __getstate__(self):
+        # The pool only works in this process, and the solver's memo can be large,
+        # so don't copy them into worker processes
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['endgameSolver'] = SushiGoEndgameSolver()
+        return state
+
+    def getMove(self, board):
+        moves = {board.moveKey(move): move for move in board.getPossibleMoves()}
+        if len(moves) == 1:
+            return next(iter(moves.values()))
+        if self.endgameTricks is not None and SushiGoEndgameSolver.can_solve(board, self.endgameTricks):
+            return self.endgameSolver.getMove(board, self)
+
+        seat = board.players.index(self)
+        pool = self.startPool()
+        if pool is None:
+            tasks = [(board, seat, self.playouts, self.timeBudget, self.policy, self.rng.getrandbits(64), self.valueModel)]
+            results = map(run_rollouts, tasks)
+        else:
+            share = None if self.playouts is None else math.ceil(self.playouts / pool.numWorkers)
+            tasks = [(board, seat, share, self.timeBudget, self.policy, self.rng.getrandbits(64), self.valueModel)
+                     for _ in range(pool.numWorkers)]
+            results = pool.imap_unordered(run_rollouts, tasks)
+
+        totals = {key: [0, 0] for key in moves}
+        for result in results:
+            for key, (margin, count) in result.items():
+                totals[key][0] += margin
+                totals[key][1] += count
+
+        # Ties go to the move listed first, so the choice is the same whatever order the workers finish in
+        played = [key for key in moves if totals[key][1] > 0]
+        if not played:
+            return self.rng.choice(list(moves.values()))
+        best = max(played, key=lambda key: totals[key][0] / totals[key][1])
+        return moves[best]
+
+    def startPool(self):
+        """
+        Returns:
+            pool: the worker pool, started if needed, or None to play out in this process
+        """
+        if self.numWorkers <= 1 or mp.current_process().daemon:
+            return None
+        if self.pool is None:
+            self.pool = WorkerPool(self.numWorkers)
+        return self.pool
+
+    def close(self):
+        """
+        Stops the worker pool, if one was started
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
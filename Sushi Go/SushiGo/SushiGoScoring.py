@@ -0,0 +1,151 @@
+import numpy as np
+
+from SushiGo.Card import Card
+
+# Vectorized Sushi Go scoring. Tableaus are count tensors of shape (games, players, 12),
+# one slot per Card.Type in the order of its value, so thousands of finished tableaus
+# can be scored at once. A single game is a batch of one
+
+NUM_TYPES = len(Card.Type)
+TEMPURA = Card.Type.TEMPURA.value - 1
+SASHIMI = Card.Type.SASHIMI.value - 1
+DUMPLING = Card.Type.DUMPLING.value - 1
+PUDDING = Card.Type.PUDDING.value - 1
+WASABI = Card.Type.WASABI.value - 1
+MAKI = [Card.Type.SINGLE_MAKI.value - 1, Card.Type.DOUBLE_MAKI.value - 1, Card.Type.TRIPLE_MAKI.value - 1]
+NIGIRI = [Card.Type.SALMON_NIGIRI.value - 1, Card.Type.SQUID_NIGIRI.value - 1, Card.Type.EGG_NIGIRI.value - 1]
+
+MAKI_ICONS = np.array([1, 2, 3])
+NIGIRI_SCORES = np.array([2, 3, 1]) # In the order of NIGIRI
+DUMPLING_SCORES = np.array([0, 1, 3, 6, 10, 15])
+
+
+def counts(cards):
+    """
+    Input:
+        cards: a list of Cards
+
+    Returns:
+        counts: an array of 12 counts, one per card type
+    """
+    return np.bincount([card.type.value - 1 for card in cards], minlength=NUM_TYPES)
+
+
+def wasabi_nigiri(cards):
+    """
+    Encodes the part of a tableau that depends on the order it was played in
+
+    Input:
+        cards: a list of Cards in the order they were played
+
+    Returns:
+        dipped: an array with the number of salmon, squid and egg nigiri that were
+                played on a wasabi, in the order of NIGIRI
+    """
+    dipped = np.zeros(len(NIGIRI), dtype=int)
+    wasabi = 0
+    for card in cards:
+        index = card.type.value - 1
+        if index == WASABI:
+            wasabi += 1
+        elif index in NIGIRI and wasabi:
+            wasabi -= 1
+            dipped[NIGIRI.index(index)] += 1
+    return dipped
+
+
+def place_bonus(values, first, second):
+    """
+    Input:
+        values: an array of shape (games, players)
+        first: the bonus for the most, split between everyone who ties for it
+        second: the bonus for the second most, split the same way. There is no
+                second place when first place is tied. Players with 0 never place
+
+    Returns:
+        bonus: an array of shape (games, players)
+    """
+    top = values.max(axis=1, keepdims=True)
+    is_first = (values == top) & (values > 0)
+    n_first = is_first.sum(axis=1, keepdims=True)
+    runner_up = np.where(values < top, values, 0).max(axis=1, keepdims=True)
+    is_second = (values == runner_up) & (runner_up > 0) & (n_first == 1)
+    n_second = is_second.sum(axis=1, keepdims=True)
+    return (np.where(is_first, first // np.maximum(n_first, 1), 0)
+            + np.where(is_second, second // np.maximum(n_second, 1), 0))
+
+
+def maki_bonus(tableaus):
+    """
+    Input:
+        tableaus: a count tensor of shape (games, players, 12)
+
+    Returns:
+        bonus: the maki points of every player, an array of shape (games, players)
+    """
+    return place_bonus(tableaus[..., MAKI] @ MAKI_ICONS, 6, 3)
+
+
+def pudding_bonus(tableaus):
+    """
+    Input:
+        tableaus: a count tensor of shape (games, players, 12) at the end of the game
+
+    Returns:
+        bonus: the pudding points of every player, an array of shape (games, players).
+               Nobody scores when everyone has the same number of puddings
+    """
+    puddings = tableaus[..., PUDDING]
+    most = puddings.max(axis=1, keepdims=True)
+    fewest = puddings.min(axis=1, keepdims=True)
+    is_most = puddings == most
+    is_fewest = (puddings == fewest) & ~is_most
+    bonus = (np.where(is_most, 6 // is_most.sum(axis=1, keepdims=True), 0)
+             - np.where(is_fewest, 6 // np.maximum(is_fewest.sum(axis=1, keepdims=True), 1), 0))
+    return np.where(most == fewest, 0, bonus)
+
+
+def card_scores(tableaus, dipped):
+    """
+    Input:
+        tableaus: a count tensor of shape (games, players, 12) at the end of a round
+        dipped: the wasabi_nigiri encoding of every tableau, shape (games, players, 3)
+
+    Returns:
+        scores: the points every player scores this round without maki,
+                an array of shape (games, players)
+    """
+    scores = (tableaus[..., TEMPURA] // 2) * 5
+    scores = scores + (tableaus[..., SASHIMI] // 3) * 10
+    scores = scores + DUMPLING_SCORES[np.minimum(tableaus[..., DUMPLING], 5)]
+    # A dipped nigiri scores three times, so twice more on top of its plain score
+    scores = scores + (tableaus[..., NIGIRI] + 2 * dipped) @ NIGIRI_SCORES
+    return scores
+
+
+def round_scores(tableaus, dipped):
+    """
+    Returns:
+        scores: the points every player scores this round, maki included,
+                an array of shape (games, players)
+    """
+    return maki_bonus(tableaus) + card_scores(tableaus, dipped)
+
+
+def score_tableaus(tableaus, dipped, final=False):
+    """
+    Input:
+        tableaus: a count tensor of shape (games, players, 12) at the end of a round
+        dipped: the wasabi_nigiri encoding of every tableau, shape (games, players, 3)
+        final: True for the last round, to score puddings as well
+
+    Returns:
+        scores: a map with the 'round' scores (maki included), the 'maki' bonuses and
+                the 'pudding' bonuses (zero unless final), each of shape (games, players)
+    """
+    maki = maki_bonus(tableaus)
+    return {
+        'round': maki + card_scores(tableaus, dipped),
+        'maki': maki,
+        'pudding': pudding_bonus(tableaus) if final else np.zeros(tableaus.shape[:2], dtype=int)
+    }
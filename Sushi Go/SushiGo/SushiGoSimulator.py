@@ -0,0 +1,306 @@
+import random
+
+import numpy as np
+
+from GameEngine import GameEngine
+from GameRandom import spawn_rng
+from Player import Player
+from SushiGo.Card import Card
+from SushiGo.DeckOfCards import DeckOfCards
+from SushiGo.SushiGoBoard import SushiGoBoard
+from SushiGo.SushiGoMove import SushiGoMove
+from SushiGo.SushiGoCPUPlayerAdapter import SushiGoCPUPlayerAdapter
+from SushiGo.SushiGoYOURNAMEPlayer import SushiGoYOURNAMEPlayer
+from SushiGo import SushiGoScoring
+
+# Plays thousands of games of Sushi Go in lockstep as arrays: a priority-list bot
+# (SushiGoYOURNAMEPlayer) in seat 0 against random players in the other seats, like
+# grid_search_mp.evaluate_config. Hands and tableaus are count tensors of shape
+# (games, players, 12) as in SushiGoScoring, and every game takes each turn at the same time
+
+TYPES = list(Card.Type)
+NUM_TYPES = len(TYPES)
+HAND_SIZE = 7
+ROUNDS = 3
+TURNS = ROUNDS * HAND_SIZE # Chopsticks go back into the hand, so every round has 7 turns
+CHOPSTICKS = Card.Type.CHOPSTICKS.value - 1
+NO_CARD = -1
+
+# The slot of each nigiri in SushiGoScoring's dipped encoding, -1 for other types
+NIGIRI_SLOT = np.full(NUM_TYPES, -1)
+NIGIRI_SLOT[SushiGoScoring.NIGIRI] = np.arange(len(SushiGoScoring.NIGIRI))
+
+
+def new_deck(rng):
+    """
+    Input:
+        rng: the random number generator a SushiGoBoard is built with
+
+    Returns:
+        deck: the type indices of the cards that board deals, in the order it deals them
+    """
+    # SushiGoBoard initializes its DeckOfCards a second time, so it deals from two sets of cards
+    deck = DeckOfCards(rng)
+    deck.initialize_deck()
+    return [card.type.value - 1 for card in reversed(deck.cards)]
+
+
+DECK = np.sort(new_deck(random.Random(0)))
+
+
+def new_generator(seed, *path):
+    """
+    Returns:
+        generator: a NumPy generator that depends only on the seed and the path,
+                   or on fresh entropy when the seed is None
+    """
+    if seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng(spawn_rng(seed, *path).getrandbits(128))
+
+
+def priority_array(priorities):
+    """
+    Input:
+        priorities: a map of Card.Type to priority, lowest first, like SushiGoYOURNAMEPlayer.priorities
+
+    Returns:
+        priorities: an array of 12 priorities, one per type index
+    """
+    return np.array([priorities[card_type] for card_type in TYPES])
+
+
+# Every move SushiGoBoard.getPossibleMoves can offer, by type: each single type, each pair
+# of types with chopsticks, and wasabi before each nigiri
+MOVE_FIRST = [index for index in range(NUM_TYPES)]
+MOVE_SECOND = [NO_CARD] * NUM_TYPES
+for first in range(NUM_TYPES):
+    for second in range(first, NUM_TYPES):
+        MOVE_FIRST.append(first)
+        MOVE_SECOND.append(second)
+for nigiri in SushiGoScoring.NIGIRI:
+    MOVE_FIRST.append(SushiGoScoring.WASABI)
+    MOVE_SECOND.append(nigiri)
+MOVE_FIRST = np.array(MOVE_FIRST)
+MOVE_SECOND = np.array(MOVE_SECOND)
+IS_PAIR = MOVE_SECOND != NO_CARD
+SAME_TYPE = MOVE_FIRST == MOVE_SECOND
+# Wasabi and a nigiri are offered in both orders, so each order stands for half of their pairs of cards
+PAIR_SHARE = np.where(np.isin(MOVE_FIRST, SushiGoScoring.NIGIRI) & (MOVE_SECOND == SushiGoScoring.WASABI)
+                      | (MOVE_FIRST == SushiGoScoring.WASABI) & np.isin(MOVE_SECOND, SushiGoScoring.NIGIRI), 1, 2)
+
+
+def random_moves(hands, chopsticks, generator):
+    """
+    Picks moves the way RandomPlayer does on SushiGoBoard: uniformly over the cards in the hand
+    and, for players with chopsticks on the table, over the pairs of cards, which is the same as
+    weighting each move by SushiGoCountBoard.card_moves
+
+    Input:
+        hands: count tensor of shape (games, players, 12)
+        chopsticks: boolean array of shape (games, players)
+
+    Returns:
+        first, second: type indices of shape (games, players); second is NO_CARD
+                       for players who play a single card
+    """
+    # Draws count in halves, so the two orders of wasabi and a nigiri can share their pairs
+    cards = hands.sum(axis=-1)
+    singles = 2 * cards
+    draws = (generator.random(cards.shape) * (singles + cards * (cards - 1) * chopsticks)).astype(np.int32)
+
+    # Most players play a single card, which only needs the 12 counts
+    first = ((2 * hands).cumsum(axis=-1, dtype=np.int32) > draws[..., None]).argmax(axis=-1)
+    second = np.full(cards.shape, NO_CARD)
+
+    # The few who picked a pair look it up in the table of pair moves
+    use_pair = draws >= singles
+    if use_pair.any():
+        picked = hands[use_pair]
+        firsts = picked[:, MOVE_FIRST]
+        seconds = picked[:, np.maximum(MOVE_SECOND, 0)]
+        weights = np.where(SAME_TYPE, firsts * (firsts - 1), firsts * seconds * PAIR_SHARE) * IS_PAIR
+        moves = (weights.cumsum(axis=-1, dtype=np.int32) > (draws - singles)[use_pair, None]).argmax(axis=-1)
+        first[use_pair] = MOVE_FIRST[moves]
+        second[use_pair] = MOVE_SECOND[moves]
+    return first, second
+
+
+def play_cards(played, wasabi, dipped, cards):
+    """
+    Puts one card per player on the table, in place, and puts nigiri on unused wasabi
+
+    Input:
+        cards: type indices of shape (games, players), NO_CARD for players who play nothing
+    """
+    games, players = np.indices(cards.shape)
+    playing = cards != NO_CARD
+    index = np.maximum(cards, 0)
+    played[games, players, index] += playing
+    slot = NIGIRI_SLOT[index]
+    dip = playing & (slot >= 0) & (wasabi > 0)
+    wasabi -= dip
+    dipped[games, players, np.maximum(slot, 0)] += dip
+    wasabi += playing & (index == SushiGoScoring.WASABI)
+
+
+def play_games(priorities, decks, num_players, generator, record=False):
+    """
+    Plays one game per row of priorities in lockstep
+
+    Input:
+        priorities: array of shape (games, 12), the priority list of the bot in seat 0 of each game
+        decks: array of shape (games, cards), the type indices of each game's deck in dealing order
+        num_players: the number of players, the bot included
+        generator: the NumPy generator the random players draw from
+        record: True to return every move as well
+
+    Returns:
+        scores: final scores of shape (games, players)
+        moves: if record, the type indices played each turn, of shape (games, 21, players, 2),
+               with NO_CARD as the second card of single-card moves
+    """
+    num_games = len(priorities)
+    shape = (num_games, num_players)
+    hands = np.zeros(shape + (NUM_TYPES,), dtype=np.int32)
+    played = np.zeros(shape + (NUM_TYPES,), dtype=np.int32)
+    dipped = np.zeros(shape + (len(SushiGoScoring.NIGIRI),), dtype=np.int32)
+    wasabi = np.zeros(shape, dtype=np.int32)
+    scores = np.zeros(shape, dtype=np.int32)
+    moves = np.full((num_games, TURNS, num_players, 2), NO_CARD, dtype=np.int8) if record else None
+    games, seats = np.indices(shape)
+    unplayable = priorities.max() + 1
+
+    for round_number in range(1, ROUNDS + 1):
+        # Deal like SushiGoBoard.setup_round: one card to each player in turn, seven times
+        dealt = round_number - 1
+        cards = decks[:, dealt * HAND_SIZE * num_players:round_number * HAND_SIZE * num_players]
+        for card in cards.reshape(num_games, HAND_SIZE, num_players).transpose(1, 0, 2):
+            hands[games, seats, card] += 1
+
+        for turn in range(HAND_SIZE):
+            first = np.empty(shape, dtype=int)
+            second = np.full(shape, NO_CARD)
+
+            # The bot plays the card in its hand with the lowest priority
+            first[:, 0] = np.where(hands[:, 0] > 0, priorities, unplayable).argmin(axis=-1)
+            first[:, 1:], second[:, 1:] = random_moves(hands[:, 1:], played[:, 1:, CHOPSTICKS] > 0, generator)
+            if record:
+                moves[:, dealt * HAND_SIZE + turn, :, 0] = first
+                moves[:, dealt * HAND_SIZE + turn, :, 1] = second
+
+            # Reveal: used chopsticks go back into the hand, then the cards are played in order
+            pair = second != NO_CARD
+            hands[games, seats, first] -= 1
+            hands[games, seats, np.maximum(second, 0)] -= pair
+            played[..., CHOPSTICKS] -= pair
+            hands[..., CHOPSTICKS] += pair
+            play_cards(played, wasabi, dipped, first)
+            play_cards(played, wasabi, dipped, second)
+
+            # Pass hands left in rounds 1 and 3 and right in round 2
+            hands = np.roll(hands, -1 if round_number != 2 else 1, axis=1)
+
+        scores += SushiGoScoring.round_scores(played, dipped)
+        if round_number == ROUNDS:
+            scores += SushiGoScoring.pudding_bonus(played)
+        played[..., :SushiGoScoring.PUDDING] = 0
+        played[..., SushiGoScoring.PUDDING + 1:] = 0
+        dipped[:] = 0
+        wasabi[:] = 0
+
+    return scores, moves
+
+
+def win_rates(configs, num_games, num_players=4, seed=None, batch_size=200000):
+    """
+    Evaluates priority lists like grid_search_mp.evaluate_config, all at once
+
+    Input:
+        configs: a list of maps of Card.Type to priority
+        num_games: the number of games each config plays. Every config plays the same deals
+        num_players: the number of players, the bot included
+        seed: optional root seed, to make the results reproducible
+        batch_size: the most games played in lockstep at a time, to bound memory
+
+    Returns:
+        win_rates: an array with the fraction of games each config wins. Like
+                   evaluate_config, a tie for the top score counts as a win
+    """
+    generator = new_generator(seed, "lockstep")
+    decks = generator.permuted(np.broadcast_to(DECK, (num_games, len(DECK))), axis=1)
+    priorities = np.array([priority_array(config) for config in configs])
+
+    wins = []
+    per_batch = max(1, batch_size // num_games)
+    for start in range(0, len(configs), per_batch):
+        batch = priorities[start:start + per_batch]
+        scores, _ = play_games(np.repeat(batch, num_games, axis=0), np.tile(decks, (len(batch), 1)),
+                               num_players, generator)
+        wins.append((scores[:, 0] == scores.max(axis=1)).reshape(len(batch), num_games))
+    return np.concatenate(wins).mean(axis=1)
+
+
+class ScriptedPlayer(Player):
+    """
+    Plays a list of moves given as type indices, for replaying simulated games on a SushiGoBoard
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.script = iter(())
+
+    def getMove(self, board):
+        first, second = next(self.script)
+        hand = board.hands[self]
+        card = next(card for card in hand if card.type.value - 1 == first)
+        if second == NO_CARD:
+            return SushiGoMove(self, card)
+        second_card = next(other for other in hand if other is not card and other.type.value - 1 == second)
+        return SushiGoMove(self, card, second_card)
+
+
+def verify(configs, num_games, seed, num_players=4):
+    """
+    Checks the simulator against SushiGoBoard on shared seeds. Each game is simulated with
+    the deck of game index of a seeded GameEngine.run_batch, which is the deck evaluate_config
+    deals with the same seed, then played again on SushiGoBoard with the bot choosing its own
+    cards and the random players repeating their simulated moves
+
+    Input:
+        configs: a list of maps of Card.Type to priority
+        num_games: the number of games each config plays
+        seed: the root seed shared with the boards
+
+    Returns:
+        mismatches: a list of (config number, game index, simulated scores, board scores)
+                    for every game that ended differently. Empty when the two agree
+    """
+    decks = np.array([new_deck(spawn_rng(seed, index, "board")) for index in range(num_games)])
+    priorities = np.array([priority_array(config) for config in configs])
+    scores, moves = play_games(np.repeat(priorities, num_games, axis=0), np.tile(decks, (len(configs), 1)),
+                               num_players, new_generator(seed, "verify"), record=True)
+
+    mismatches = []
+    for number, config in enumerate(configs):
+        bot = SushiGoYOURNAMEPlayer("Config Player")
+        bot.priorities = config
+        players = [SushiGoCPUPlayerAdapter(bot)] + [ScriptedPlayer(f"Random {i}") for i in range(num_players - 1)]
+
+        def new_board(index, rng):
+            game = number * num_games + index
+            for seat, player in enumerate(players[1:], 1):
+                player.script = iter(moves[game, :, seat].tolist())
+            board = SushiGoBoard(players, rng)
+            board.output = False
+            return board
+
+        def compare(index, board, winner):
+            game = number * num_games + index
+            simulated = scores[game].tolist()
+            actual = [board.scoreBoard()[player] for player in players]
+            if simulated != actual:
+                mismatches.append((number, index, simulated, actual))
+
+        GameEngine(None).run_batch(new_board, num_games, compare, seed)
+    return mismatches
@@ -0,0 +1,147 @@
+import json
+import os
+import random
+
+import numpy as np
+
+from SushiGo.SushiGoCountBoard import (SushiGoCountBoard, TYPES, NUM_TYPES, SINGLE_MAKI, DOUBLE_MAKI,
+                                      TRIPLE_MAKI, PUDDING)
+
+# A linear value function for Sushi Go: features of a position from one player's point of view,
+# and ridge regression weights that predict that player's final margin over the best other player.
+# Evaluating a position is one dot product, so it can stand in for a playout or score a search leaf
+
+FEATURES = ([f"own_{card_type.name.lower()}" for card_type in TYPES]
+            + [f"others_{card_type.name.lower()}" for card_type in TYPES]
+            + [f"hand_{card_type.name.lower()}" for card_type in TYPES]
+            + ["round_1", "round_2", "round_3", "tricks_left", "num_players", "score_margin",
+               "provisional_margin", "maki_lead", "pudding_lead", "pudding_trail", "unused_wasabi", "bias"])
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "value_weights.json")
+
+
+def maki_icons(counts):
+    return counts[SINGLE_MAKI] + 2 * counts[DOUBLE_MAKI] + 3 * counts[TRIPLE_MAKI]
+
+
+def features(board, player):
+    """
+    Input:
+        board: a SushiGoCountBoard, or a SushiGoBoard, which is converted first
+        player: the player whose point of view to take. Only their own unrevealed
+                picks are counted, as the others' are hidden
+
+    Returns:
+        features: a list of floats in the order of FEATURES
+    """
+    if not isinstance(board, SushiGoCountBoard):
+        board = SushiGoCountBoard.from_board(board)
+    seat = board.players.index(player)
+    others = [other for other in range(len(board.players)) if other != seat]
+
+    own = list(board.played_counts[seat])
+    for index in board.chosen[seat]:
+        own[index] += 1
+    others_mean = [sum(board.played_counts[other][index] for other in others) / len(others)
+                   for index in range(NUM_TYPES)]
+    hand = board.hand_counts[seat]
+
+    provisional = [score + points for score, points in zip(board.scores, board.round_scores())]
+    makis = [maki_icons(counts) for counts in board.played_counts]
+    puddings = [counts[PUDDING] for counts in board.played_counts]
+    round_number = board.current_round
+
+    return (own + others_mean + list(hand)
+            + [round_number == 1, round_number == 2, round_number == 3,
+               sum(hand) + len(board.chosen[seat]), len(board.players),
+               board.scores[seat] - max(board.scores[other] for other in others),
+               provisional[seat] - max(provisional[other] for other in others),
+               makis[seat] - max(makis[other] for other in others),
+               puddings[seat] - max(puddings[other] for other in others),
+               puddings[seat] - min(puddings[other] for other in others),
+               board.wasabi[seat], 1])
+
+
+def collect(num_games, num_players=(2, 3, 4, 5), policy=None, seed=None):
+    """
+    Plays games on SushiGoCountBoard and takes the features of every player at the start
+    of every trick, labelled with that player's final margin
+
+    Input:
+        num_games: the number of games to play
+        num_players: the player counts to cycle through
+        policy: a function of (board, rng) that returns the move to play, random by default
+        seed: optional seed, to make the data reproducible
+
+    Returns:
+        X, y: a feature matrix of shape (states, len(FEATURES)) and the margins of shape (states,)
+    """
+    from Player import Player
+    from SushiGo.SushiGoRolloutPlayer import random_policy
+
+    policy = policy if policy is not None else random_policy
+    rng = random.Random(seed)
+    rows = []
+    labels = []
+    for game in range(num_games):
+        count = num_players[game % len(num_players)]
+        players = [Player(f"Player {seat}") for seat in range(count)]
+        board = SushiGoCountBoard(players, random.Random(rng.getrandbits(64)))
+        board.output = False
+
+        states = []
+        while not board.getGameEnded():
+            if board.current_seat == 0:
+                states.extend((seat, features(board, player)) for seat, player in enumerate(players))
+            board.doMove(policy(board, rng))
+
+        scores = board.scores
+        for seat, row in states:
+            rows.append(row)
+            labels.append(scores[seat] - max(score for other, score in enumerate(scores) if other != seat))
+    return np.array(rows, dtype=float), np.array(labels, dtype=float)
+
+
+def fit(X, y, ridge=1.0):
+    """
+    Input:
+        X, y: a feature matrix and its labels, as from collect
+        ridge: the strength of the L2 penalty. The bias is not penalized
+
+    Returns:
+        weights: an array of len(FEATURES) weights
+    """
+    penalty = ridge * np.eye(X.shape[1])
+    penalty[FEATURES.index("bias"), FEATURES.index("bias")] = 0
+    return np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+
+class SushiGoValueModel():
+    """
+    Predicts a player's final margin over the best other player from a position.
+    evaluate has the signature of MinimaxPlayer.scoreBoard, so a subclass can return it from there
+    """
+
+    def __init__(self, weights):
+        self.weights = [float(weight) for weight in weights]
+
+    def evaluate(self, board, player):
+        """
+        Returns:
+            margin: the predicted final margin of player
+        """
+        return sum(weight * feature for weight, feature in zip(self.weights, features(board, player)))
+
+    def save(self, path=WEIGHTS_PATH):
+        with open(path, 'w') as f:
+            json.dump(dict(zip(FEATURES, self.weights)), f, indent=2)
+
+    @staticmethod
+    def load(path=WEIGHTS_PATH):
+        """
+        Returns:
+            model: the model saved at path, the shipped weights by default
+        """
+        with open(path) as f:
+            weights = json.load(f)
+        return SushiGoValueModel([weights[name] for name in FEATURES])
@@ -0,0 +1,338 @@
+import collections
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Listener, Client
+
+# A work queue that spreads tasks over worker processes on any number of machines.
+# WorkQueueExecutor is the coordinator: it has the imap/imap_unordered/close interface of
+# WorkerPool, so a search can take either. Workers connect to it over TCP, ask for a task,
+# send back its result and get the next one. A task is leased to one worker at a time; if the
+# worker drops its connection, fails, or keeps the task past the lease, the task goes back in
+# the queue, up to maxAttempts times. Only the first result for a task is kept.
+#
+# Messages are pickled, so workers must run the same code as the coordinator, and anyone who
+# can connect can run code on both: bind to a trusted network only, with a secret authkey.
+
+
+def function_name(func):
+    """
+    Returns:
+        module, name: where a worker can import func from, even if it is in the script being run
+    """
+    module = func.__module__
+    if module == "__main__":
+        main = sys.modules["__main__"]
+        spec = getattr(main, "__spec__", None)
+        module = spec.name if spec is not None else os.path.splitext(os.path.basename(main.__file__))[0]
+    return module, func.__qualname__
+
+
+def import_function(module, name):
+    return getattr(importlib.import_module(module), name)
+
+
+class WorkQueueExecutor():
+    """
+    The coordinator of a work queue. Start workers with run_worker, the command line
+    "python WorkQueue.py HOST PORT [PROCESSES]" or startLocalWorkers
+    """
+
+    def __init__(self, address=("localhost", 0), authkey=None, leaseSeconds=300, maxAttempts=3):
+        """
+        Input:
+            address: the (host, port) to listen on; port 0 picks a free one, see self.address
+            authkey: bytes that workers must also have to connect
+            leaseSeconds: how long a worker may keep a task before it is given to another
+            maxAttempts: how many times a task is given out before its failure is raised
+        """
+        if authkey is None:
+            raise ValueError("A work queue needs an authkey, as its messages are pickled")
+        self.authkey = authkey
+        self.leaseSeconds = leaseSeconds
+        self.maxAttempts = maxAttempts
+
+        self.lock = threading.Condition()
+        self.ready = collections.deque() # Task ids waiting for a worker
+        self.tasks = {} # Task id to (module, function name, args), until it is done
+        self.leases = {} # Task id to the time its lease runs out and the connection holding it
+        self.attempts = collections.Counter()
+        self.results = {} # Task id to ("result", value) or ("error", message)
+        self.nextId = 0
+        self.workers = 0
+        self.localWorkers = []
+        self.closed = False
+
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.acceptThread = threading.Thread(target=self.accept, daemon=True)
+        self.acceptThread.start()
+
+    @property
+    def numWorkers(self):
+        """The number of workers connected now"""
+        with self.lock:
+            return self.workers
+
+    def accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except Exception:
+                if self.closed:
+                    return
+                continue
+            if self.closed:
+                connection.close()
+                return
+            threading.Thread(target=self.serve, args=(connection,), daemon=True).start()
+
+    def serve(self, connection):
+        """
+        Talks to one worker process: every message from it is a request for the next task,
+        and may carry the result of the last one
+        """
+        with self.lock:
+            self.workers += 1
+        leased = None
+        try:
+            while True:
+                message = connection.recv()
+                with self.lock:
+                    if message[0] in ("result", "error"):
+                        self.finish(message[1], message[0], message[2])
+                        leased = None
+                    task = self.lease(id(connection))
+                if task is None:
+                    connection.send(("stop",))
+                    return
+                leased = task[0]
+                connection.send(("task",) + task)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self.lock:
+                self.workers -= 1
+                # A worker that drops its connection gives back its task straight away
+                if leased is not None and self.leases.get(leased, (None, None))[1] == id(connection):
+                    del self.leases[leased]
+                    self.finish(leased, "error", "The worker disconnected")
+            connection.close()
+
+    def lease(self, owner):
+        """
+        Waits, with the lock held, for a task to hand out
+
+        Returns:
+            task: (task id, module, name, args), or None when the queue is closed
+        """
+        while not self.closed:
+            now = time.monotonic()
+            for taskId, (deadline, _) in list(self.leases.items()):
+                if deadline <= now:
+                    del self.leases[taskId]
+                    self.finish(taskId, "error", f"Its lease of {self.leaseSeconds}s ran out")
+            if self.ready:
+                taskId = self.ready.popleft()
+                self.attempts[taskId] += 1
+                self.leases[taskId] = (now + self.leaseSeconds, owner)
+                return (taskId,) + self.tasks[taskId]
+            deadlines = [deadline for deadline, _ in self.leases.values()]
+            self.lock.wait(timeout=max(0.01, min(deadlines) - now) if deadlines else 1)
+        return None
+
+    def finish(self, taskId, kind, value):
+        """
+        Records a task's outcome, with the lock held. A failed task goes back in the queue until
+        it has been tried maxAttempts times. Only the first result of a task is kept, so a worker
+        that was too slow for its lease can still finish it, and a second copy is ignored
+        """
+        if taskId in self.results or taskId not in self.tasks:
+            return
+        self.leases.pop(taskId, None)
+        if kind == "error" and self.attempts[taskId] < self.maxAttempts:
+            self.ready.appendleft(taskId)
+        else:
+            del self.tasks[taskId]
+            self.results[taskId] = (kind, value)
+        self.lock.notify_all()
+
+    def submit(self, func, tasks):
+        """
+        Returns:
+            ids: the ids of the tasks, in order
+        """
+        module, name = function_name(func)
+        with self.lock:
+            if self.closed:
+                raise ValueError("The work queue is closed")
+            ids = []
+            for args in tasks:
+                self.tasks[self.nextId] = (module, name, args)
+                self.ready.append(self.nextId)
+                ids.append(self.nextId)
+                self.nextId += 1
+            self.lock.notify_all()
+        return ids
+
+    def collect(self, taskId):
+        """
+        Waits for a task to be done
+
+        Returns:
+            result: the task's result. A task that failed maxAttempts times raises
+        """
+        with self.lock:
+            while taskId not in self.results:
+                self.lock.wait()
+            kind, value = self.results.pop(taskId)
+            attempts = self.attempts.pop(taskId, 0)
+        if kind == "error":
+            raise RuntimeError(f"Task {taskId} failed after {attempts} attempts:\n{value}")
+        return value
+
+    def imap(self, func, tasks):
+        """
+        Returns:
+            An iterator of func applied to each task, in the order of the tasks.
+            func must be a module-level function the workers can import
+        """
+        ids = self.submit(func, tasks)
+
+        return (self.collect(taskId) for taskId in ids)
+
+    def imap_unordered(self, func, tasks):
+        """
+        Returns:
+            An iterator of func applied to each task, in the order they finish
+        """
+        ids = self.submit(func, tasks)
+
+        def results():
+            waiting = set(ids)
+            while waiting:
+                with self.lock:
+                    while not waiting & self.results.keys():
+                        self.lock.wait()
+                    taskId = min(waiting & self.results.keys())
+                waiting.discard(taskId)
+                yield self.collect(taskId)
+        return results()
+
+    def startLocalWorkers(self, count):
+        """
+        Starts count worker processes on this machine, which stop when the queue closes
+        """
+        host, port = self.address
+        for _ in range(count):
+            process = multiprocessing.Process(target=run_worker, args=((host, port), self.authkey), daemon=True)
+            process.start()
+            self.localWorkers.append(process)
+
+    def close(self):
+        """
+        Stops handing out tasks and tells the workers to stop
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.lock.notify_all()
+        # Wake the accept thread up so it sees the queue is closed
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except Exception:
+            pass
+        self.listener.close()
+        for process in self.localWorkers:
+            process.join()
+
+    def terminate(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+
+def run_worker(address, authkey, retrySeconds=30):
+    """
+    Runs tasks from the coordinator at address, one at a time, until it closes
+
+    Input:
+        retrySeconds: how long to keep trying to reach a coordinator that isn't up yet
+    """
+    deadline = time.monotonic() + retrySeconds
+    while True:
+        try:
+            connection = Client(tuple(address), authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)
+
+    functions = {}
+    try:
+        connection.send(("ready",))
+        while True:
+            message = connection.recv()
+            if message[0] == "stop":
+                return
+            _, taskId, module, name, args = message
+            try:
+                if (module, name) not in functions:
+                    functions[(module, name)] = import_function(module, name)
+                reply = ("result", taskId, functions[(module, name)](args))
+            except Exception:
+                reply = ("error", taskId, traceback.format_exc())
+            connection.send(reply)
+    except (EOFError, OSError):
+        pass
+    finally:
+        connection.close()
+
+
+def run_workers(address, authkey, processes):
+    """
+    Runs processes workers on this machine, until the coordinator closes
+    """
+    workers = [multiprocessing.Process(target=run_worker, args=(address, authkey)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def executor_from_args(argv):
+    """
+    Input:
+        argv: command line arguments, which may have "--serve HOST:PORT"
+
+    Returns:
+        executor: a WorkQueueExecutor listening there with the key in WORKQUEUE_AUTHKEY,
+                  or None to run locally
+    """
+    if "--serve" not in argv:
+        return None
+    host, port = argv[argv.index("--serve") + 1].rsplit(":", 1)
+    if "WORKQUEUE_AUTHKEY" not in os.environ:
+        sys.exit("Set WORKQUEUE_AUTHKEY to the key the workers will use")
+    executor = WorkQueueExecutor((host, int(port)), os.environ["WORKQUEUE_AUTHKEY"].encode())
+    print(f"Waiting for workers on {host}:{port}")
+    return executor
+
+
+if __name__ == "__main__":
+    # python WorkQueue.py HOST PORT [PROCESSES], with the key in WORKQUEUE_AUTHKEY,
+    # from the directory the coordinator's search runs in
+    if len(sys.argv) < 3 or "WORKQUEUE_AUTHKEY" not in os.environ:
+        sys.exit("Usage: WORKQUEUE_AUTHKEY=... python WorkQueue.py HOST PORT [PROCESSES]")
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    run_workers((sys.argv[1], int(sys.argv[2])), os.environ["WORKQUEUE_AUTHKEY"].encode(), processes)
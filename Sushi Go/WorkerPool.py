@@ -0,0 +1,74 @@
+import gc
+import importlib
+import multiprocessing
+import time
+
+
+class WorkerPool():
+    """
+    A process pool that is started once and reused for a whole search, so workers
+    are forked, and game modules imported, once instead of once per generation
+    """
+
+    def __init__(self, numWorkers, maxTasksPerChild=None, preload=()):
+        """
+        Input:
+            numWorkers: the number of worker processes
+            maxTasksPerChild: optional number of tasks after which a worker is replaced
+                              by a fresh one, to stop leaks from building up
+            preload: names of modules to import in this process before the workers start,
+                     so forked workers share them instead of importing their own
+        """
+        for name in preload:
+            importlib.import_module(name)
+
+        # Forked workers share the parent's memory until they write to it. Freezing moves
+        # every object the parent has so far out of reach of the garbage collector, so the
+        # workers' collections don't write to those pages and copy them
+        gc.collect()
+        gc.freeze()
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        start = time.perf_counter()
+        self.pool = context.Pool(processes=numWorkers, maxtasksperchild=maxTasksPerChild)
+        self.startupSeconds = time.perf_counter() - start
+        self.numWorkers = numWorkers
+
+    def imap(self, func, tasks):
+        """
+        Returns:
+            An iterator of func applied to each task, in the order of the tasks
+        """
+        return self.pool.imap(func, tasks)
+
+    def imap_unordered(self, func, tasks):
+        """
+        Returns:
+            An iterator of func applied to each task, in the order they finish
+        """
+        return self.pool.imap_unordered(func, tasks)
+
+    def close(self):
+        """
+        Waits for the workers to finish and stops them
+        """
+        self.pool.close()
+        self.pool.join()
+        gc.unfreeze()
+
+    def terminate(self):
+        """
+        Stops the workers at once, dropping any unfinished tasks
+        """
+        self.pool.terminate()
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            self.terminate()
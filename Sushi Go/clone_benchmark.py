@@ -0,0 +1,41 @@
+import random
+import time
+
+from RandomPlayer import RandomPlayer
+from SushiGo.SushiGoBoard import SushiGoBoard
+from SushiGo.SushiGoCountBoard import SushiGoCountBoard
+
+# Measures how fast boards clone, at the start of a game and part way through one
+# Run from this folder: python clone_benchmark.py
+
+
+def clones_per_second(board, seconds=1.0):
+    clones = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < seconds:
+        for _ in range(100):
+            board.clone()
+        clones += 100
+        elapsed = time.perf_counter() - start
+    return clones / elapsed
+
+
+def new_board(rng, board_class=SushiGoBoard):
+    board = board_class([RandomPlayer(f"Random {i}") for i in range(4)], rng)
+    board.output = False
+    return board
+
+
+def play(board, moves, rng):
+    for _ in range(moves):
+        board.doMove(rng.choice(board.getPossibleMoves()))
+    return board
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    for board_class in (SushiGoBoard, SushiGoCountBoard):
+        print(board_class.__name__)
+        print(f"Start of game: {clones_per_second(new_board(rng, board_class)):>10,.0f} clones/sec")
+        print(f"Mid game:      {clones_per_second(play(new_board(rng, board_class), 40, rng)):>10,.0f} clones/sec")
@@ -1,14 +1,25 @@
+import math
 import random
+from contextlib import nullcontext
 from datetime import datetime
-from multiprocessing import Pool
+from statistics import NormalDist
 from copy import deepcopy
 from tqdm import tqdm
 from GameEngine import GameEngine
+from GameRandom import spawn_rng, spawn_seed
+from WorkerPool import WorkerPool
+from FitnessStore import FitnessStore
+from Checkpoint import ResultLog, read_results, save_checkpoint, load_checkpoint
 from SushiGo.SushiGoBoard import SushiGoBoard
 from SushiGo.Card import Card
 from SushiGo.SushiGoYOURNAMEPlayer import SushiGoYOURNAMEPlayer
+from SushiGo.SushiGoCPUPlayerAdapter import SushiGoCPUPlayerAdapter
 from RandomPlayer import RandomPlayer
 
+# What a config's games are played against, saved with the fitness store. Bump ENGINE_VERSION
+# when a change to the game, the engine or the players makes old tallies wrong
+OPPONENTS = "3 RandomPlayer, 4-player SushiGoBoard, ties count as wins"
+ENGINE_VERSION = 2 # 2: RandomPlayer picks uniformly over cards again, not over card types
 
 class ConfigurableYOURNAMEPlayer(SushiGoYOURNAMEPlayer):
     """Wrapper to allow setting custom priorities"""
@@ -29,20 +40,27 @@ def run_game(players, print_output=False):
 def evaluate_config(config_tuple):
     """
     Evaluate a single priority configuration.
+    With a seed, every configuration plays the same games, whichever worker runs it.
     Returns (config_dict, win_rate)
     """
-    config, num_games = config_tuple
+    config, num_games, seed = config_tuple
     
+    our_player = SushiGoCPUPlayerAdapter(ConfigurableYOURNAMEPlayer("Config Player", config))
+    players = [our_player] + [RandomPlayer(f"Random {i}") for i in range(3)]
     wins = 0
-    for _ in range(num_games):
-        our_player = ConfigurableYOURNAMEPlayer("Config Player", config)
-        random_players = [RandomPlayer(f"Random {i}") for i in range(3)]
-        players = [our_player] + random_players
-        
-        scores = run_game(players, print_output=False)
-        max_score = max(scores.values())
-        if scores[our_player] == max_score:
+
+    def new_board(index, rng):
+        board = SushiGoBoard(players, rng)
+        board.output = False
+        return board
+
+    def count_win(index, board, winner):
+        nonlocal wins
+        scores = board.scoreBoard()
+        if scores[our_player] == max(scores.values()):
             wins += 1
+
+    GameEngine(None).run_batch(new_board, num_games, count_win, seed)
     
     win_rate = wins / num_games
     return (config, win_rate)
@@ -51,10 +69,36 @@ def evaluate_config(config_tuple):
 class EvolutionarySearch:
     """Evolutionary algorithm for finding optimal card priorities"""
     
-    def __init__(self, population_size=50, games_per_eval=15, num_workers=4):
+    def __init__(self, population_size=50, games_per_eval=15, num_workers=4, seed=None, max_tasks_per_child=None,
+                 sequential=False, chunk_games=5, max_games_per_eval=None, confidence=0.9,
+                 fitness_path=None, elite_games=5, executor=None):
         self.population_size = population_size
         self.games_per_eval = games_per_eval
         self.num_workers = num_workers
+
+        # Wins and games of every config so far, loaded from and saved to fitness_path if given.
+        # A config that already has games_per_eval games plays elite_games more per generation
+        self.fitness_store = FitnessStore(fitness_path, OPPONENTS, ENGINE_VERSION)
+        self.elite_games = elite_games
+
+        # Sequential evaluation plays chunk_games at a time and stops an individual as soon as it is
+        # clearly above or below the elite cutoff, up to max_games_per_eval games. A generation never
+        # plays more than games_per_eval games per distinct config in all, what fixed evaluation costs
+        self.sequential = sequential
+        self.chunk_games = chunk_games
+        self.max_games_per_eval = max_games_per_eval if max_games_per_eval is not None else games_per_eval
+        self.confidence = confidence
+
+        # One pool of workers serves every generation of evolve()
+        # max_tasks_per_child replaces each worker after that many configs, in case of leaks
+        # An executor, such as a WorkQueueExecutor, is used instead of starting a pool
+        self.max_tasks_per_child = max_tasks_per_child
+        self.executor = executor
+        self.pool = executor
+
+        # With a seed, the whole search is reproducible for any number of workers
+        self.seed = seed
+        self.rng = spawn_rng(seed, "evolution") if seed is not None else random
         
         self.card_types = [
             Card.Type.TEMPURA,
@@ -76,11 +120,12 @@ class EvolutionarySearch:
         self.generation = 0
         self.best_overall = None
         self.best_overall_fitness = 0
+        self.best_overall_bound = float("-inf") # Lower credible bound of the best, for sequential evaluation
     
     def create_random_config(self):
         """Create a random priority configuration"""
         shuffled = self.card_types.copy()
-        random.shuffle(shuffled)
+        self.rng.shuffle(shuffled)
         return {card_type: idx + 1 for idx, card_type in enumerate(shuffled)}
     
     def initialize_population(self):
@@ -88,32 +133,176 @@ class EvolutionarySearch:
         self.population = [self.create_random_config() for _ in range(self.population_size)]
     
     def evaluate_population(self):
-        """Evaluate fitness of all individuals in population"""
-        eval_tasks = [(config, self.games_per_eval) for config in self.population]
-        self.fitness_scores = {}
+        """
+        Evaluate fitness of all individuals in population.
+        Games add to the tallies in the fitness store, so each distinct config is played once per
+        generation however often it appears, and an elite keeps the games it played before.
+        """
+        if self.sequential:
+            self.evaluate_population_sequential()
+        else:
+            self.evaluate_population_fixed()
+        self.fitness_store.save()
+
+    def unique_population(self):
+        """Returns a map of store key to config for the distinct configs, in population order"""
+        unique = {}
+        for config in self.population:
+            unique.setdefault(FitnessStore.key(config), config)
+        return unique
+
+    def games_seed(self, key):
+        """
+        The seed of a config's next games. Configs with as many games in the same generation play
+        the same games, and as a config's count only grows, it never plays a game twice, in this
+        run or a later one that loads the store
+        """
+        if self.seed is None:
+            return None
+        return spawn_seed(self.seed, "generation", self.generation, "from", self.fitness_store.get(key)[1])
+
+    def evaluate_population_fixed(self):
+        """
+        New configs play games_per_eval games; configs that already have them play elite_games more
+        """
+        unique = self.unique_population()
+        eval_tasks = []
+        for key, config in unique.items():
+            games = self.fitness_store.get(key)[1]
+            extra = max(self.games_per_eval, games + self.elite_games) - games
+            if extra > 0:
+                eval_tasks.append((key, (config, extra, self.games_seed(key))))
         
-        with Pool(processes=self.num_workers) as pool:
-            for config, win_rate in tqdm(
-                pool.imap_unordered(evaluate_config, eval_tasks),
+        # Outside of evolve(), start workers just for this evaluation
+        pool = self.pool if self.pool is not None else self.start_pool()
+        try:
+            results = pool.imap(evaluate_config, [task for _, task in eval_tasks])
+            for (key, (_, extra, _)), (config, win_rate) in tqdm(
+                zip(eval_tasks, results),
                 total=len(eval_tasks),
                 desc=f"Gen {self.generation} Evaluation",
                 unit="config"
             ):
-                config_key = tuple(sorted(config.items(), key=lambda x: x[1]))
-                self.fitness_scores[config_key] = win_rate
-                
-                # Track best found so far
-                if win_rate > self.best_overall_fitness:
-                    self.best_overall_fitness = win_rate
-                    self.best_overall = config
-                    tqdm.write(f"🎯 NEW BEST: {win_rate:.2%} win rate (Gen {self.generation})")
+                self.fitness_store.add(key, round(win_rate * extra), extra)
+        finally:
+            if pool is not self.pool:
+                pool.close()
+
+        self.fitness_scores = {key: self.fitness_store.win_rate(key) for key in unique}
+        played = sum(extra for _, (_, extra, _) in eval_tasks)
+        print(f"Gen {self.generation} Evaluation: {played} new games for {len(eval_tasks)} of {len(unique)} distinct configs, "
+              f"{sum(self.fitness_store.get(key)[1] for key in unique) - played} reused from the fitness store")
+
+        # Track best found so far, by the latest tallies; ties go to the earlier config
+        candidates = list(unique.items())
+        if self.best_overall is not None:
+            candidates.append((FitnessStore.key(self.best_overall), self.best_overall))
+        key, config = max(candidates, key=lambda candidate: self.fitness_store.win_rate(candidate[0]))
+        if self.best_overall is None or key != FitnessStore.key(self.best_overall):
+            tqdm.write(f"🎯 NEW BEST: {self.fitness_store.win_rate(key):.2%} win rate "
+                       f"over {self.fitness_store.get(key)[1]} games (Gen {self.generation})")
+        self.best_overall = config
+        self.best_overall_fitness = self.fitness_store.win_rate(key)
+
+    def evaluate_population_sequential(self):
+        """
+        Evaluate the population in chunks of games, with a Bayesian stopping rule.
+        Each individual's win rate has a Beta(1 + wins, 1 + losses) posterior over every game in the
+        fitness store. The elite cutoff is the median posterior mean, the line selection() splits the
+        population on. Individuals whose credible interval lies wholly above or below the cutoff stop,
+        so a clear elite costs nothing; only the borderline ones play on, up to max_games_per_eval new
+        games a generation. The generation's budget is games_per_eval games per distinct config, the cost
+        of fixed evaluation; when it runs short, the individuals closest to the cutoff play first.
+        Fitness is the posterior mean, and the best overall is the individual with the highest lower
+        credible bound, so a lucky short run can't take it.
+        """
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        unique = self.unique_population()
+        keys = list(unique)
+        played = {key: 0 for key in keys}
+        budget = self.games_per_eval * len(keys)
+        cutoff = 0.5
+
+        def posterior(key):
+            wins, games = self.fitness_store.get(key)
+            a = 1 + wins
+            b = 1 + games - wins
+            mean = a / (a + b)
+            return mean, math.sqrt(a * b / ((a + b) ** 2 * (a + b + 1)))
+
+        def borderline(candidates):
+            # The median over the whole population, so duplicates weigh as much as selection() gives them
+            nonlocal cutoff
+            means = sorted(posterior(FitnessStore.key(config))[0] for config in self.population)
+            cutoff = means[len(means) // 2]
+            return [key for key in candidates
+                    if played[key] < self.max_games_per_eval and abs(posterior(key)[0] - cutoff) <= z * posterior(key)[1]]
+
+        def closeness(key):
+            mean, spread = posterior(key)
+            return abs(mean - cutoff) / spread
+
+        pool = self.pool if self.pool is not None else self.start_pool()
+        try:
+            chunk = 0
+            undecided = borderline(keys)
+            while undecided and sum(played.values()) < budget:
+                left = budget - sum(played.values())
+                undecided.sort(key=closeness)
+                sizes = []
+                for key in undecided:
+                    sizes.append(min(self.chunk_games, self.max_games_per_eval - played[key], left))
+                    left -= sizes[-1]
+                undecided = [key for key, size in zip(undecided, sizes) if size > 0]
+                sizes = [size for size in sizes if size > 0]
+                eval_tasks = [(unique[key], size, self.games_seed(key)) for key, size in zip(undecided, sizes)]
+                for key, size, (config, win_rate) in zip(undecided, sizes, pool.imap(evaluate_config, eval_tasks)):
+                    self.fitness_store.add(key, round(win_rate * size), size)
+                    played[key] += size
+                undecided = borderline(undecided)
+                chunk += 1
+        finally:
+            if pool is not self.pool:
+                pool.close()
+
+        self.fitness_scores = {key: posterior(key)[0] for key in keys}
+
+        def lower_bound(key):
+            fitness, spread = posterior(key)
+            return fitness - z * spread
+
+        # The best so far is judged again on its latest tally; ties go to the earlier config
+        candidates = list(unique.items())
+        if self.best_overall is not None:
+            candidates.append((FitnessStore.key(self.best_overall), self.best_overall))
+        key, config = max(candidates, key=lambda candidate: lower_bound(candidate[0]))
+        if self.best_overall is None or key != FitnessStore.key(self.best_overall):
+            tqdm.write(f"🎯 NEW BEST: {posterior(key)[0]:.2%} posterior win rate "
+                       f"over {self.fitness_store.get(key)[1]} games (Gen {self.generation})")
+        self.best_overall = config
+        self.best_overall_bound = lower_bound(key)
+        self.best_overall_fitness = posterior(key)[0]
+
+        total = sum(played.values())
+        print(f"Gen {self.generation} Evaluation: {total} games in {chunk} chunks, "
+              f"{budget - total} of the {budget} of fixed evaluation saved ({1 - total / budget:.0%}); "
+              f"{sum(1 for games in played.values() if games >= self.max_games_per_eval)} individuals played the maximum, "
+              f"{len(self.population) - len(keys)} duplicates skipped")
+
+    def start_pool(self):
+        """Start the worker processes, with the game modules already imported"""
+        return WorkerPool(
+            self.num_workers,
+            self.max_tasks_per_child,
+            preload=("GameEngine", "SushiGo.SushiGoBoard", "SushiGo.SushiGoYOURNAMEPlayer", "RandomPlayer")
+        )
     
     def selection(self):
         """Select top individuals for breeding"""
         # Sort by fitness
         sorted_pop = sorted(
             self.population,
-            key=lambda config: self.fitness_scores.get(tuple(sorted(config.items(), key=lambda x: x[1])), 0),
+            key=lambda config: self.fitness_scores.get(FitnessStore.key(config), 0),
             reverse=True
         )
         
@@ -128,8 +317,8 @@ class EvolutionarySearch:
         child = parent1.copy()
         
         # Randomly swap some card priorities with parent2
-        num_swaps = random.randint(1, 4)
-        swap_cards = random.sample(self.card_types, num_swaps)
+        num_swaps = self.rng.randint(1, 4)
+        swap_cards = self.rng.sample(self.card_types, num_swaps)
         
         for card in swap_cards:
             child[card] = parent2[card]
@@ -146,17 +335,17 @@ class EvolutionarySearch:
         child = config.copy()
         
         # Randomly shuffle some priorities
-        if random.random() < mutation_rate:
+        if self.rng.random() < mutation_rate:
             # Swap two random cards' priorities
-            card1, card2 = random.sample(self.card_types, 2)
+            card1, card2 = self.rng.sample(self.card_types, 2)
             child[card1], child[card2] = child[card2], child[card1]
         
         # Sometimes do a bigger mutation
-        if random.random() < 0.1:
+        if self.rng.random() < 0.1:
             # Re-randomize 2-3 cards
-            cards_to_reshuffle = random.sample(self.card_types, random.randint(2, 3))
+            cards_to_reshuffle = self.rng.sample(self.card_types, self.rng.randint(2, 3))
             values = [child[card] for card in cards_to_reshuffle]
-            random.shuffle(values)
+            self.rng.shuffle(values)
             for card, val in zip(cards_to_reshuffle, values):
                 child[card] = val
         
@@ -186,8 +375,8 @@ class EvolutionarySearch:
         
         # Generate offspring to reach population size
         while len(new_population) < self.population_size:
-            parent1 = random.choice(self.population)
-            parent2 = random.choice(self.population)
+            parent1 = self.rng.choice(self.population)
+            parent2 = self.rng.choice(self.population)
             
             # Crossover
             child = self.crossover(parent1, parent2)
@@ -199,8 +388,41 @@ class EvolutionarySearch:
         
         self.population = new_population[:self.population_size]
     
-    def evolve(self, num_generations=30):
-        """Run the evolutionary algorithm"""
+    def checkpoint(self):
+        """Returns everything evolve() needs to carry on from the next generation"""
+        return {
+            'seed': self.seed,
+            'population_size': self.population_size,
+            'generation': self.generation + 1,
+            'population': self.population,
+            'rng_state': self.rng.getstate(),
+            'tallies': self.fitness_store.tallies,
+            'best_overall': self.best_overall,
+            'best_overall_fitness': self.best_overall_fitness,
+            'best_overall_bound': self.best_overall_bound
+        }
+
+    def restore(self, state):
+        """Carry on from a checkpoint() of the same search"""
+        for name in ('seed', 'population_size'):
+            if state[name] != getattr(self, name):
+                raise ValueError(f"Can't resume: the checkpoint has {name}={state[name]}, not {getattr(self, name)}")
+        self.generation = state['generation']
+        self.population = state['population']
+        self.rng.setstate(state['rng_state'])
+        self.fitness_store.tallies = state['tallies']
+        self.best_overall = state['best_overall']
+        self.best_overall_fitness = state['best_overall_fitness']
+        self.best_overall_bound = state['best_overall_bound']
+
+    def evolve(self, num_generations=30, checkpoint_path=None, checkpoint_every=1, log_path=None, resume=False):
+        """
+        Run the evolutionary algorithm.
+        With a checkpoint_path, the population, random state and tallies are saved every
+        checkpoint_every generations, and resume carries on from the last one saved; with a seed,
+        a resumed search ends the same as one that was never stopped. With a log_path, every
+        generation's stats are appended to it as a JSON line.
+        """
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"\n{'='*70}")
         print(f"Evolutionary Search Started: {timestamp}")
@@ -209,32 +431,67 @@ class EvolutionarySearch:
         print(f"Number of generations: {num_generations}")
         print(f"{'='*70}\n")
         
-        self.initialize_population()
-        
-        for gen in range(num_generations):
-            self.generation = gen
-            
-            print(f"\n--- Generation {gen + 1}/{num_generations} ---")
-            
-            # Evaluate
-            self.evaluate_population()
-            
-            # Get stats
-            fitness_values = list(self.fitness_scores.values())
-            avg_fitness = sum(fitness_values) / len(fitness_values)
-            max_fitness = max(fitness_values)
-            
-            print(f"Avg fitness: {avg_fitness:.2%} | Max fitness: {max_fitness:.2%} | Best overall: {self.best_overall_fitness:.2%}")
-            
-            # Selection
-            self.selection()
-            
-            # Breeding
-            self.breed()
+        state = load_checkpoint(checkpoint_path) if resume and checkpoint_path is not None else None
+        if state is not None:
+            self.restore(state)
+            print(f"Resuming from generation {self.generation + 1} of '{checkpoint_path}'")
+        else:
+            self.generation = 0
+            self.initialize_population()
+        if log_path is not None and state is not None:
+            # Drop the stats of generations after the checkpoint, as they are about to be played again
+            kept = [record for record in read_results(log_path) if record['generation'] < self.generation]
+            with ResultLog(log_path, append=False) as log:
+                for record in kept:
+                    log.write(record)
+        log = ResultLog(log_path, append=state is not None) if log_path is not None else None
         
-        # Final evaluation
-        self.generation = num_generations
-        self.evaluate_population()
+        with self.start_pool() if self.executor is None else nullcontext(self.executor) as pool:
+            self.pool = pool
+            if self.executor is None:
+                print(f"Started {self.num_workers} workers in {pool.startupSeconds:.2f}s")
+            try:
+                for gen in range(self.generation, num_generations):
+                    self.generation = gen
+                    
+                    print(f"\n--- Generation {gen + 1}/{num_generations} ---")
+                    
+                    # Evaluate
+                    self.evaluate_population()
+                    
+                    # Get stats
+                    fitness_values = list(self.fitness_scores.values())
+                    avg_fitness = sum(fitness_values) / len(fitness_values)
+                    max_fitness = max(fitness_values)
+                    
+                    print(f"Avg fitness: {avg_fitness:.2%} | Max fitness: {max_fitness:.2%} | Best overall: {self.best_overall_fitness:.2%}")
+                    if log is not None:
+                        log.write({
+                            'generation': gen,
+                            'avg_fitness': avg_fitness,
+                            'max_fitness': max_fitness,
+                            'best_overall_fitness': self.best_overall_fitness,
+                            'best_overall': FitnessStore.key(self.best_overall)
+                        })
+                    
+                    # Selection
+                    self.selection()
+                    
+                    # Breeding
+                    self.breed()
+
+                    if checkpoint_path is not None and ((gen + 1) % checkpoint_every == 0 or gen + 1 == num_generations):
+                        if log is not None:
+                            log.sync()
+                        save_checkpoint(checkpoint_path, self.checkpoint())
+                
+                # Final evaluation
+                self.generation = num_generations
+                self.evaluate_population()
+            finally:
+                self.pool = self.executor
+                if log is not None:
+                    log.close()
         
         print(f"\n{'='*70}")
         print(f"EVOLUTION COMPLETE")
@@ -251,14 +508,30 @@ class EvolutionarySearch:
 
 
 if __name__ == "__main__":
-    # Run evolutionary search
+    import sys
+    from WorkQueue import executor_from_args
+
+    # Run evolutionary search; --resume carries on from the last checkpoint of an interrupted run,
+    # and --serve HOST:PORT plays the configs on workers started with WorkQueue.py
+    executor = executor_from_args(sys.argv[1:])
     evo = EvolutionarySearch(
         population_size=40,      # Population of 40 individuals
         games_per_eval=15,       # 15 games per evaluation (faster feedback)
-        num_workers=4            # 4 parallel workers
+        num_workers=4,           # 4 parallel workers
+        fitness_path='evo_search_fitness.json', # Tallies carry over to the next run
+        executor=executor
     )
     
-    best_config, best_fitness = evo.evolve(num_generations=25)
+    try:
+        best_config, best_fitness = evo.evolve(
+            num_generations=25,
+            checkpoint_path='evo_search_checkpoint.pkl',
+            log_path='evo_search_log.jsonl',
+            resume="--resume" in sys.argv[1:]
+        )
+    finally:
+        if executor is not None:
+            executor.close()
     
     # Save results
     import json
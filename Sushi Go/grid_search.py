@@ -5,6 +5,7 @@ from GameEngine import GameEngine
 from SushiGo.SushiGoBoard import SushiGoBoard
 from SushiGo.Card import Card
 from SushiGo.SushiGoYOURNAMEPlayer import SushiGoYOURNAMEPlayer
+from SushiGo.SushiGoCPUPlayerAdapter import SushiGoCPUPlayerAdapter
 from RandomPlayer import RandomPlayer
 
 class ConfigurableYOURNAMEPlayer(SushiGoYOURNAMEPlayer):
@@ -30,7 +31,7 @@ def evaluate_config(priorities_config, num_games=50):
     
     for _ in range(num_games):
         # Create players: our configured player vs 3 random players
-        our_player = ConfigurableYOURNAMEPlayer("Config Player", priorities_config)
+        our_player = SushiGoCPUPlayerAdapter(ConfigurableYOURNAMEPlayer("Config Player", priorities_config))
         random_players = [RandomPlayer(f"Random {i}") for i in range(3)]
         players = [our_player] + random_players
         
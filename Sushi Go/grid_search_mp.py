@@ -1,13 +1,20 @@
 import itertools
 import json
+import math
 import random
+import sys
+from contextlib import nullcontext
 from datetime import datetime
 from multiprocessing import Pool, Manager
 from tqdm import tqdm
 from GameEngine import GameEngine
+from GameRandom import spawn_rng, spawn_seed
+from WorkerPool import WorkerPool
+from Checkpoint import ResultLog, read_results, repair_results
 from SushiGo.SushiGoBoard import SushiGoBoard
 from SushiGo.Card import Card
 from SushiGo.SushiGoYOURNAMEPlayer import SushiGoYOURNAMEPlayer
+from SushiGo.SushiGoCPUPlayerAdapter import SushiGoCPUPlayerAdapter
 from RandomPlayer import RandomPlayer
 
 class ConfigurableYOURNAMEPlayer(SushiGoYOURNAMEPlayer):
@@ -27,25 +34,39 @@ def run_game(players, print_output=False):
 def evaluate_config(config_tuple):
     """
     Evaluate a single priority configuration.
+    With a seed, every configuration plays the same games, whichever worker runs it.
     Returns (config_name, priorities_dict, win_rate)
     """
-    config_name, priorities_config, num_games = config_tuple
+    config_name, priorities_config, num_games, seed = config_tuple
     
+    our_player = SushiGoCPUPlayerAdapter(ConfigurableYOURNAMEPlayer("Config Player", priorities_config))
+    players = [our_player] + [RandomPlayer(f"Random {i}") for i in range(3)]
     wins = 0
-    for _ in range(num_games):
-        our_player = ConfigurableYOURNAMEPlayer("Config Player", priorities_config)
-        random_players = [RandomPlayer(f"Random {i}") for i in range(3)]
-        players = [our_player] + random_players
-        
-        scores = run_game(players, print_output=False)
-        max_score = max(scores.values())
-        if scores[our_player] == max_score:
+
+    def new_board(index, rng):
+        board = SushiGoBoard(players, rng)
+        board.output = False
+        return board
+
+    def count_win(index, board, winner):
+        nonlocal wins
+        scores = board.scoreBoard()
+        if scores[our_player] == max(scores.values()):
             wins += 1
+
+    GameEngine(None).run_batch(new_board, num_games, count_win, seed)
     
     win_rate = wins / num_games
     return (config_name, priorities_config, win_rate)
 
-def generate_all_configs(num_random_perms=2000):
+def evaluate_chunk(config_tuple):
+    """
+    evaluate_config for the racing search, which also needs to know how many games were played.
+    Returns (config_name, priorities_dict, win_rate, num_games)
+    """
+    return evaluate_config(config_tuple) + (config_tuple[2],)
+
+def generate_all_configs(num_random_perms=2000, rng=random):
     """
     Generate a large number of random priority configurations.
     Tests strategic variations plus many random permutations.
@@ -154,22 +175,47 @@ def generate_all_configs(num_random_perms=2000):
     print(f"Generating {num_random_perms} random configurations...")
     for i in range(num_random_perms):
         shuffled = card_types.copy()
-        random.shuffle(shuffled)
+        rng.shuffle(shuffled)
         random_config = {card_type: idx + 1 for idx, card_type in enumerate(shuffled)}
         configs.append((f"random_{i}", random_config))
     
     return configs
 
-def grid_search_parallel(num_games_per_config=20, num_workers=4, num_random_perms=2000):
+def grid_search_parallel(num_games_per_config=20, num_workers=4, num_random_perms=2000, seed=None,
+                         results_path='grid_search_results_mp.jsonl', resume=False, executor=None):
     """
     Perform comprehensive parallel grid search.
+    With a seed, the configurations and every game are reproducible,
+    and the results are the same for any number of workers.
+    Each result is appended to results_path as it arrives, after a first line with the settings.
+    With resume, the search carries on from results_path: the same configurations are made
+    again and only the ones without a result are played.
+    With an executor, such as a WorkQueueExecutor, configurations are played on it instead of
+    on num_workers local processes.
     """
-    
-    configs = generate_all_configs(num_random_perms=num_random_perms)
+    saved = read_results(results_path) if resume else []
+    settings = {
+        'num_games_per_config': num_games_per_config,
+        'num_random_perms': num_random_perms,
+        'seed': seed,
+        # Unseeded games still need the same configurations on resume
+        'config_seed': seed if seed is not None else random.randrange(2 ** 63)
+    }
+    if saved:
+        header, saved = saved[0], saved[1:]
+        for name in ('num_games_per_config', 'num_random_perms', 'seed'):
+            if header[name] != settings[name]:
+                raise ValueError(f"Can't resume {results_path}: it has {name}={header[name]}, not {settings[name]}")
+        settings = header
+
+    rng = spawn_rng(settings['config_seed'], "configs")
+    configs = generate_all_configs(num_random_perms=num_random_perms, rng=rng)
+    priorities = dict(configs)
     total_configs = len(configs)
     
     # Prepare evaluation tasks
-    eval_tasks = [(name, config, num_games_per_config) for name, config in configs]
+    done = {record['config_name'] for record in saved}
+    eval_tasks = [(name, config, num_games_per_config, seed) for name, config in configs if name not in done]
     
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"\n{'='*70}")
@@ -178,21 +224,34 @@ def grid_search_parallel(num_games_per_config=20, num_workers=4, num_random_perm
     print(f"Games per config: {num_games_per_config}")
     print(f"Total game simulations: ~{total_configs * num_games_per_config:,}")
     print(f"Worker processes: {num_workers}")
+    print(f"Seed: {seed}")
+    if done:
+        print(f"Resuming: {len(done)} configurations already evaluated in '{results_path}'")
     print(f"{'='*70}\n")
     
-    best_win_rate = 0
+    results = [{'config_name': record['config_name'], 'win_rate': record['win_rate'],
+                'priorities': priorities[record['config_name']]} for record in saved]
+    best_win_rate = max((result['win_rate'] for result in results), default=0)
     best_config = None
-    results = []
-    processed = 0
+    processed = len(results)
+    if saved:
+        repair_results(results_path)
     
     # Use multiprocessing pool with live progress updates using tqdm
-    with Pool(processes=num_workers) as pool:
-        for config_name, priorities, win_rate in tqdm(pool.imap_unordered(evaluate_config, eval_tasks), total=total_configs, desc="Evaluating configs", unit="config"):
+    with (Pool(processes=num_workers) if executor is None else nullcontext(executor)) as pool, ResultLog(results_path, append=bool(saved)) as log:
+        if not saved:
+            log.write(settings)
+        for config_name, priorities_config, win_rate in tqdm(pool.imap_unordered(evaluate_config, eval_tasks), initial=processed, total=total_configs, desc="Evaluating configs", unit="config"):
             processed += 1
             results.append({
                 'config_name': config_name,
                 'win_rate': win_rate,
-                'priorities': priorities
+                'priorities': priorities_config
+            })
+            log.write({
+                'config_name': config_name,
+                'win_rate': win_rate,
+                'priorities': {str(k): v for k, v in priorities_config.items()}
             })
             
             # Track best found so far
@@ -201,8 +260,8 @@ def grid_search_parallel(num_games_per_config=20, num_workers=4, num_random_perm
                 best_config = config_name
                 tqdm.write(f"🎯 NEW BEST: {config_name} - {win_rate:.2%} win rate")
     
-    # Sort results by win rate
-    results.sort(key=lambda x: x['win_rate'], reverse=True)
+    # Sort results by win rate, breaking ties by name so the order doesn't depend on the workers
+    results.sort(key=lambda x: (-x['win_rate'], x['config_name']))
     
     print(f"\n{'='*70}")
     print("FINAL RESULTS (Top 20)")
@@ -237,13 +296,143 @@ def grid_search_parallel(num_games_per_config=20, num_workers=4, num_random_perm
     
     return results
 
+def wilson_interval(wins, games, z=1.96):
+    """
+    Returns:
+        low, high: the 95% Wilson score interval of a win rate
+    """
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return center - spread, center + spread
+
+def grid_search_racing(initial_games=5, eta=4, finalists=4, max_games=4000, num_workers=4,
+                       num_random_perms=2000, seed=None, chunk_games=250, executor=None):
+    """
+    Successive halving over the same configurations as grid_search_parallel.
+    Every configuration plays initial_games games, then only the best 1/eta of them go on,
+    with eta times as many games in all, until finalists are left to play max_games each.
+    Games already played count toward the next rung, so no game is wasted.
+    With a seed, every configuration in a rung plays the same new games, and the
+    results are the same for any number of workers.
+    With an executor, the chunks are played on it instead of on num_workers local processes.
+    """
+    rng = spawn_rng(seed, "configs") if seed is not None else random
+    configs = generate_all_configs(num_random_perms=num_random_perms, rng=rng)
+    priorities = dict(configs)
+    totals = {name: [0, 0] for name, _ in configs} # wins and games
+    survivors = [name for name, _ in configs]
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"\n{'='*70}")
+    print(f"Racing Grid Search Started: {timestamp}")
+    print(f"Total configurations: {len(configs)}")
+    print(f"First rung: {initial_games} games each, keeping the best 1/{eta} per rung")
+    print(f"Finalists: {finalists} with {max_games} games each")
+    print(f"Worker processes: {num_workers}")
+    print(f"Seed: {seed}")
+    print(f"{'='*70}\n")
+
+    budget = initial_games
+    rung = 0
+    with (WorkerPool(num_workers) if executor is None else nullcontext(executor)) as pool:
+        while True:
+            final = len(survivors) <= finalists
+            target = max_games if final else budget
+
+            # Split the new games of every survivor into chunks, so a few finalists still use every worker
+            eval_tasks = []
+            for name in survivors:
+                extra = target - totals[name][1]
+                for chunk in range(math.ceil(extra / chunk_games)):
+                    games = min(chunk_games, extra - chunk * chunk_games)
+                    chunk_seed = None if seed is None else spawn_seed(seed, "race", rung, chunk)
+                    eval_tasks.append((name, priorities[name], games, chunk_seed))
+
+            for config_name, _, win_rate, games in tqdm(pool.imap_unordered(evaluate_chunk, eval_tasks),
+                                                        total=len(eval_tasks), desc=f"Rung {rung + 1}", unit="task"):
+                totals[config_name][0] += round(win_rate * games)
+                totals[config_name][1] += games
+
+            survivors.sort(key=lambda name: (-totals[name][0] / totals[name][1], name))
+            best = survivors[0]
+            tqdm.write(f"Rung {rung + 1}: {len(survivors)} configs at {target} games, "
+                       f"best {best} - {totals[best][0] / totals[best][1]:.2%}")
+            if final:
+                break
+            survivors = survivors[:max(finalists, math.ceil(len(survivors) / eta))]
+            budget = min(budget * eta, max_games)
+            rung += 1
+
+    played = sum(games for _, games in totals.values())
+    results = []
+    for name in survivors:
+        wins, games = totals[name]
+        low, high = wilson_interval(wins, games)
+        results.append({
+            'config_name': name,
+            'win_rate': wins / games,
+            'games': games,
+            'ci_low': low,
+            'ci_high': high,
+            'priorities': priorities[name]
+        })
+
+    print(f"\n{'='*70}")
+    print(f"FINALISTS ({played:,} games in all, {played / len(configs):.1f} per config)")
+    print(f"{'='*70}\n")
+    for idx, result in enumerate(results):
+        print(f"{idx+1:2d}. {result['config_name']:20s} - {result['win_rate']:.2%} win rate "
+              f"(95% CI {result['ci_low']:.2%} - {result['ci_high']:.2%}, {result['games']} games)")
+    print("\nBest priorities configuration to use:")
+    print("self.priorities = {")
+    for card_type, priority in sorted(results[0]['priorities'].items(), key=lambda x: x[1]):
+        print(f"    Card.Type.{card_type.name}: {priority},")
+    print("}")
+
+    results_for_json = []
+    for result in results:
+        result_copy = result.copy()
+        result_copy['priorities'] = {str(k): v for k, v in result_copy['priorities'].items()}
+        results_for_json.append(result_copy)
+    with open('grid_search_racing_results.json', 'w') as f:
+        json.dump(results_for_json, f, indent=2)
+    print(f"Finalists saved to 'grid_search_racing_results.json'")
+
+    return results
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "race":
+        # Successive halving: the same compute as the flat search below,
+        # spent mostly on the configurations that stay in the running
+        from WorkQueue import executor_from_args
+        executor = executor_from_args(sys.argv[2:])
+        try:
+            grid_search_racing(seed=0, executor=executor)
+        finally:
+            if executor is not None:
+                executor.close()
+        sys.exit()
+
+
     # Run parallel grid search
     # - 20 games per config (fast feedback, reasonable sample size)
     # - 4 worker processes (adjust based on your CPU cores)
     # - 2000 random permutations (2000+ configurations total)
-    results = grid_search_parallel(
-        num_games_per_config=20,
-        num_workers=4,
-        num_random_perms=2000
-    )
+    # - --resume carries on from the results of an interrupted run
+    # - --serve HOST:PORT plays the configs on workers started with WorkQueue.py instead
+    from WorkQueue import executor_from_args
+    executor = executor_from_args(sys.argv[1:])
+    try:
+        results = grid_search_parallel(
+            num_games_per_config=20,
+            num_workers=4,
+            num_random_perms=2000,
+            resume="--resume" in sys.argv[1:],
+            executor=executor
+        )
+    finally:
+        if executor is not None:
+            executor.close()
@@ -1,4 +1,8 @@
+from functools import partial
+
 from GameEngine import GameEngine
+from GameProfiler import GameProfiler
+from Tournament import Tournament, ROUND_ROBIN
 from RandomPlayer import RandomPlayer
 from TiePlayer import TiePlayer
 
@@ -10,6 +14,7 @@ from SushiGo.SushiGoBoard import SushiGoBoard
 from SushiGo.SushiGoHumanPlayer import SushiGoHumanPlayer
 from SushiGo.SushiGoCPUPlayerAdapter import SushiGoCPUPlayerAdapter
 from SushiGo.SushiGoYOURNAMEPlayer import SushiGoYOURNAMEPlayer
+from SushiGo.SushiGoRolloutPlayer import SushiGoRolloutPlayer
 from SushiGo.Card import Card
 
 all_players = []
@@ -23,19 +28,63 @@ def set_seeds():
     # for item in sorted_scores.items():
     #     print(f"Player {item[0].name}: {item[1]} points")
 
-def run_many_times(players, nTimes, output = True):
+def run_many_times(players, nTimes, output = True, profile_path = None, seed = None):
     score_count = {player: 0 for player in players}
-    for i in range(nTimes):
-        scores = run_game(players, output)
+
+    def new_board(index, rng):
+        board = SushiGoBoard(players, rng)
+        board.output = output
+        return board
+
+    def count_places(index, board, winner):
+        scores = board.scoreBoard()
         sorted_scores = dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
         counter = len(players)
         for item in sorted_scores.items():
             score_count[item[0]] += counter
             counter -= 1
-            
+
+    # Pass profile_path to time every phase of every move and save <path>.json and <path>.csv
+    profiler = GameProfiler() if profile_path else None
+    # Pass a seed to make every game reproducible; replay game i with
+    # GameEngine(None).replay(new_board, seed, i)
+    results = GameEngine(None, profiler).run_batch(new_board, nTimes, count_places, seed)
+
     score_count = dict(sorted(score_count.items(), key=lambda item: item[1], reverse=True))
     for player in score_count:
         print(f"Player {player.name}: {score_count[player]} total points over {nTimes} games")
+    print(f"Played {nTimes} games at {results['games_per_sec']:.1f} games/sec")
+    if profiler is not None:
+        print(profiler.report())
+        profiler.writeJSON(profile_path + ".json")
+        profiler.writeCSV(profile_path + ".csv")
+
+def new_league_board(players, rng):
+    board = SushiGoBoard(players, rng)
+    board.output = False
+    return board
+
+def priority_bot(name, card_type):
+    # A priority player that always takes card_type first
+    player = SushiGoCPUPlayerAdapter(SushiGoYOURNAMEPlayer(name))
+    player.player.priorities[card_type] = 0
+    return player
+
+def rollout_bot(name, seconds):
+    # A Monte Carlo player with seconds to think about each move
+    return SushiGoRolloutPlayer(name, playouts = None, timeBudget = seconds)
+
+def run_league(factories, games_per_seating = 1, num_workers = None, seed = None, format = ROUND_ROBIN, seats = 5):
+    # Every lineup of seats bots plays once from each rotation of the seats, across a process pool
+    # factories build the bots inside the workers, so they must be module-level functions or partials
+    tournament = Tournament(factories, new_league_board, seats, games_per_seating, num_workers, seed, format)
+
+    def progress(result, tournament):
+        print(f"Match {result['match'] + 1}: " + ", ".join(tournament.names[entrant] for entrant in result['lineup']))
+
+    standings = tournament.run(progress)
+    print(tournament.report())
+    return standings
 
 def run_game(players, print = True):
     board = SushiGoBoard(players)
@@ -60,22 +109,31 @@ def default_run(output = True):
     for player in scores:
         print(f"Player {player.name}: {scores[player]} points")
 
-def run_tests(output = True):
-    player1 = SushiGoCPUPlayerAdapter(SushiGoYOURNAMEPlayer("Sashimi"))
-    player1.player.priorities[Card.Type.SASHIMI] = 0
-    player2 = SushiGoCPUPlayerAdapter(SushiGoYOURNAMEPlayer("Dumpling"))
-    player2.player.priorities[Card.Type.DUMPLING] = 0
-    player3 = SushiGoCPUPlayerAdapter(SushiGoYOURNAMEPlayer("Tempura"))
-    player3.player.priorities[Card.Type.TEMPURA] = 0
-    player4 = SushiGoCPUPlayerAdapter(SushiGoYOURNAMEPlayer("Pudding"))
-    player4.player.priorities[Card.Type.PUDDING] = 0
-    player5 = RandomPlayer("Random bot")
-
-    players = [player1, player2, player3, player4, player5]
-
-    scores = run_many_times(players, 100, output)
+def run_tests(seed = None):
+    factories = [
+        partial(priority_bot, "Sashimi", Card.Type.SASHIMI),
+        partial(priority_bot, "Dumpling", Card.Type.DUMPLING),
+        partial(priority_bot, "Tempura", Card.Type.TEMPURA),
+        partial(priority_bot, "Pudding", Card.Type.PUDDING),
+        partial(RandomPlayer, "Random bot")
+    ]
+
+    # 20 games from each of the 5 seatings, 100 games in all
+    run_league(factories, 20, seed = seed)
+
+def run_rollout_tests(seed = None, seconds = 0.05):
+    factories = [
+        partial(rollout_bot, "Rollout", seconds),
+        partial(priority_bot, "Sashimi", Card.Type.SASHIMI),
+        partial(priority_bot, "Dumpling", Card.Type.DUMPLING),
+        partial(priority_bot, "Tempura", Card.Type.TEMPURA),
+        partial(RandomPlayer, "Random bot")
+    ]
+
+    # The rollout bot thinks for at most seconds per move, so each of its games takes about 21 * seconds
+    run_league(factories, 4, seed = seed)
 
 if __name__ == "__main__":
      default_run()
     # set_seeds()
-    #run_tests(False)
\ No newline at end of file
+    #run_tests()
\ No newline at end of file
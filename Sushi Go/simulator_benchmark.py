@@ -0,0 +1,25 @@
+import random
+import time
+
+from SushiGo import SushiGoSimulator
+from grid_search_mp import generate_all_configs
+
+# Checks the lockstep simulator against SushiGoBoard, then times it on a population of configs
+# Run from this folder: python simulator_benchmark.py
+
+
+if __name__ == "__main__":
+    configs = [config for _, config in generate_all_configs(num_random_perms=45, rng=random.Random(0))]
+
+    mismatches = SushiGoSimulator.verify(configs[:10], 20, seed=0)
+    print(f"Verify: {len(mismatches)} of {10 * 20} games differ from SushiGoBoard")
+    for number, index, simulated, actual in mismatches[:5]:
+        print(f"  config {number} game {index}: simulated {simulated}, board {actual}")
+
+    num_games = 2000
+    start = time.perf_counter()
+    rates = SushiGoSimulator.win_rates(configs, num_games, seed=0)
+    seconds = time.perf_counter() - start
+    print(f"Played {len(configs)} configs x {num_games} games in {seconds:.1f}s "
+          f"({len(configs) * num_games / seconds:,.0f} games/sec)")
+    print(f"Best win rate: {rates.max():.2%}")
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from GameEngine import GameEngine
+from RandomPlayer import RandomPlayer
+from SushiGo.SushiGoBoard import SushiGoBoard
+from SushiGo.SushiGoRecorder import GameRecorder, RECORD, read_shard
+
+# Run from the Sushi Go folder: python -m pytest tests
+
+
+def record_games(path, games, seed):
+    players = [RandomPlayer(f"Random {i}") for i in range(4)]
+    scores = []
+
+    def new_board(index, rng):
+        board = SushiGoBoard(players, rng)
+        board.output = False
+        return board
+
+    def record(index, board, winner):
+        recorder.record_game(index, board, winner)
+        scores.append([board.scores[player] for player in players])
+
+    with GameRecorder(path, seed=seed) as recorder:
+        GameEngine(None).run_batch(new_board, games, record, seed)
+    return scores
+
+
+def test_appending_after_a_partial_record_keeps_records_aligned():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.bin")
+        scores = record_games(path, 2, "first")
+        with open(path, 'ab') as f:
+            f.write(b"\x00" * 50) # A record cut short by a crash
+        scores += record_games(path, 2, "second")
+
+        assert os.path.getsize(path) == 4 * RECORD.itemsize
+        records = read_shard(path)
+        assert records['scores'][:, :4].tolist() == scores
+        assert [seed.decode() for seed in records['seed']] == ["first", "first", "second", "second"]
+        assert (records['round_scores'].sum(axis=1) + records['pudding_scores'] == records['scores']).all()
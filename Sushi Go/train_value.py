@@ -0,0 +1,25 @@
+from SushiGo import SushiGoValue
+from SushiGo.SushiGoValue import SushiGoValueModel
+
+# Plays random games, fits the ridge value model and saves its weights for SushiGoValueModel.load
+# Run from this folder: python train_value.py
+
+
+def r_squared(X, y, weights):
+    residuals = y - X @ weights
+    return 1 - (residuals ** 2).mean() / y.var()
+
+
+if __name__ == "__main__":
+    X, y = SushiGoValue.collect(5000, seed=0)
+    X_test, y_test = SushiGoValue.collect(1000, seed=1)
+    weights = SushiGoValue.fit(X, y, ridge=1.0)
+    print(f"Fitted on {len(y):,} states, R^2 {r_squared(X, y, weights):.3f} (held out {r_squared(X_test, y_test, weights):.3f})")
+
+    # How well it predicts at the end of each round, where rollouts stop to use it
+    for round_number in (1, 2, 3):
+        rows = X_test[:, SushiGoValue.FEATURES.index(f"round_{round_number}")] == 1
+        print(f"Round {round_number}: R^2 {r_squared(X_test[rows], y_test[rows], weights):.3f}")
+
+    SushiGoValueModel(weights).save()
+    print(f"Saved to {SushiGoValue.WEIGHTS_PATH}")
@@ -1,8 +1,7 @@
 import random
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
 from SushiGo.Card import Card
 from RandomPlayer import RandomPlayer
+from WorkerPool import WorkerPool
 # (Assuming other imports like GameEngine, SushiGoBoard, etc. are available as before)
 
 # --- GENETIC ALGORITHM PARAMETERS ---
@@ -11,6 +10,8 @@ GENERATIONS = 50        # How many rounds of evolution to run
 ELITISM_COUNT = 10      # Top 10 strategies are kept unchanged
 MUTATION_RATE = 0.2     # 20% chance to swap card priorities
 GAMES_PER_EVAL = 50     # Games played to determine fitness
+NUM_WORKERS = 90        # Worker processes, started once for the whole run
+MAX_TASKS_PER_CHILD = None  # Replace a worker after this many evaluations, in case of leaks
 
 CARD_TYPES = [
     Card.Type.TEMPURA, Card.Type.SASHIMI, Card.Type.DUMPLING,
@@ -53,28 +54,29 @@ def evolve():
     
     print(f"Starting Evolution: {GENERATIONS} generations with {POPULATION_SIZE} individuals.")
 
-    for gen in range(GENERATIONS):
-        # 2. Parallel Evaluation (Fitness)
-        with ProcessPoolExecutor(max_workers=90) as executor:
-            results = list(executor.map(evaluate_fitness, population))
-        
-        # Sort by win rate (fitness)
-        results.sort(key=lambda x: x[1], reverse=True)
-        best_dna, best_win_rate = results[0]
-        
-        print(f"Gen {gen}: Best Win Rate = {best_win_rate:.2%}")
+    # The same workers evaluate every generation
+    with WorkerPool(NUM_WORKERS, MAX_TASKS_PER_CHILD) as pool:
+        for gen in range(GENERATIONS):
+            # 2. Parallel Evaluation (Fitness)
+            results = list(pool.imap(evaluate_fitness, population))
+            
+            # Sort by win rate (fitness)
+            results.sort(key=lambda x: x[1], reverse=True)
+            best_dna, best_win_rate = results[0]
+            
+            print(f"Gen {gen}: Best Win Rate = {best_win_rate:.2%}")
 
-        # 3. Selection & Elitism
-        new_population = [r[0] for r in results[:ELITISM_COUNT]]
+            # 3. Selection & Elitism
+            new_population = [r[0] for r in results[:ELITISM_COUNT]]
 
-        # 4. Reproduction (Crossover & Mutation)
-        while len(new_population) < POPULATION_SIZE:
-            p1, p2 = random.sample(new_population[:20], 2) # Pick from top 20
-            child = crossover(p1, p2)
-            child = mutate(child)
-            new_population.append(child)
-        
-        population = new_population
+            # 4. Reproduction (Crossover & Mutation)
+            while len(new_population) < POPULATION_SIZE:
+                p1, p2 = random.sample(new_population[:20], 2) # Pick from top 20
+                child = crossover(p1, p2)
+                child = mutate(child)
+                new_population.append(child)
+            
+            population = new_population
 
     return results[0] # Return the ultimate winner
 